@@ -0,0 +1,131 @@
+"""
+Cold start benchmark: time-to-first-prediction
+Run from project root: python scripts/benchmark_cold_start.py [--mode predictor|api] [--runs 5]
+
+predictor: fresh Python process that imports FraudPredictor, loads the
+           models and scores one transaction (per-phase timings).
+api:       fresh uvicorn process, polled until /health is 200, then one
+           POST /predict (what a new pod behind the HPA goes through).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+TRANSACTION = {
+    'time': 12345.0,
+    'amount': 150.50,
+    **{f'V{i}': float(i * 0.1) for i in range(1, 29)}
+}
+
+# Runs in a child process so every measurement starts from a cold interpreter
+PREDICTOR_PROBE = """
+import json, time
+start = time.perf_counter()
+from src.model.predictor import FraudPredictor
+imported = time.perf_counter()
+predictor = FraudPredictor(engine={engine!r})
+loaded = time.perf_counter()
+predictor.predict({transaction!r})
+predicted = time.perf_counter()
+print(json.dumps({{
+    'imports': imported - start,
+    'model_load': loaded - imported,
+    'first_prediction': predicted - loaded,
+    'total': predicted - start
+}}))
+"""
+
+
+def run_predictor(engine):
+    """Time imports, model load and first prediction in a fresh process."""
+    probe = PREDICTOR_PROBE.format(engine=engine, transaction=TRANSACTION)
+    wall_start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', probe],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(out.stdout.strip().splitlines()[-1])
+    timings['process_wall'] = time.perf_counter() - wall_start
+    return timings
+
+
+def run_api(engine, port):
+    """Time a fresh uvicorn process until /health is 200 and the first /predict returns."""
+    env = dict(os.environ, INFERENCE_ENGINE=engine)
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'src.inference_api:app', '--port', str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before becoming healthy")
+            try:
+                with urllib.request.urlopen(f"{base}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        break
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.02)
+        healthy = time.perf_counter()
+
+        request = urllib.request.Request(
+            f"{base}/predict",
+            data=json.dumps(TRANSACTION).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=10) as resp:
+            resp.read()
+        predicted = time.perf_counter()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        'time_to_healthy': healthy - start,
+        'first_prediction': predicted - healthy,
+        'total': predicted - start
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-prediction")
+    parser.add_argument('--mode', choices=['predictor', 'api'], default='predictor')
+    parser.add_argument('--engine', choices=['sklearn', 'native', 'all'], default='all')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    engines = ['sklearn', 'native'] if args.engine == 'all' else [args.engine]
+
+    print("=" * 60)
+    print(f"Cold Start Benchmark (mode: {args.mode}, runs: {args.runs})")
+    print("=" * 60)
+
+    for engine in engines:
+        runs = []
+        for _ in range(args.runs):
+            if args.mode == 'predictor':
+                runs.append(run_predictor(engine))
+            else:
+                runs.append(run_api(engine, args.port))
+
+        print(f"\nEngine: {engine}")
+        for phase in runs[0]:
+            values = [run[phase] * 1000 for run in runs]
+            print(f"   {phase:<18} median {statistics.median(values):8.1f}ms   "
+                  f"min {min(values):8.1f}ms   max {max(values):8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Sentinel Stream - Columnar Archive
+Optional copy of every scored transaction with its full feature vector, for
+re-scoring, audits and retraining (ARCHIVE_FORMAT=parquet or arrow).
+
+Files are partitioned by the UTC hour the rows were scored in:
+
+    ARCHIVE_DIR/hour=2026-10-17T13/part-<host>-<pid>-<start>.parquet
+
+Rows are buffered in memory and written ARCHIVE_ROW_GROUP_ROWS at a time
+(one Parquet row group / one Arrow record batch). A file is written under a
+hidden ".inprogress" name and renamed when its hour rolls over or the
+consumer stops, so readers only ever see complete files:
+
+    pd.read_parquet("data/archive")  # hour becomes a column
+
+pyarrow is imported lazily, so consumers without an archive don't need it.
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.config import ARCHIVE_FORMAT, ARCHIVE_DIR, ARCHIVE_ROW_GROUP_ROWS, ARCHIVE_COMPRESSION, WIRE_DTYPE
+from src.model.predictor import FEATURE_COLUMNS
+
+ARCHIVE_FORMATS = ('none', 'parquet', 'arrow')
+EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+
+def create_archive(model_version):
+    """ColumnarArchive configured from ARCHIVE_*, or None when ARCHIVE_FORMAT=none."""
+    if ARCHIVE_FORMAT not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown ARCHIVE_FORMAT '{ARCHIVE_FORMAT}', expected one of {ARCHIVE_FORMATS}")
+    if ARCHIVE_FORMAT == "none":
+        return None
+    archive = ColumnarArchive(ARCHIVE_DIR, ARCHIVE_FORMAT, model_version)
+    print(f"🗄️  Archiving scored rows as {ARCHIVE_FORMAT} under {ARCHIVE_DIR}")
+    return archive
+
+
+class ColumnarArchive:
+    """
+    Hour-partitioned Parquet / Arrow IPC writer for one consumer process.
+    append() is thread-safe; close() writes what is buffered and finalizes
+    the open file.
+    """
+
+    def __init__(self, directory, fmt="parquet", model_version="unknown",
+                 row_group_rows=ARCHIVE_ROW_GROUP_ROWS, compression=ARCHIVE_COMPRESSION):
+        import pyarrow as pa
+
+        if fmt not in EXTENSIONS:
+            raise ValueError(f"Unknown archive format '{fmt}', expected one of {tuple(EXTENSIONS)}")
+        self.pa = pa
+        self.directory = directory
+        self.fmt = fmt
+        self.model_version = model_version
+        self.row_group_rows = max(row_group_rows, 1)
+        self.compression = None if compression == "none" else compression
+        self.feature_type = pa.float64() if WIRE_DTYPE == "float64" else pa.float32()
+        self.schema = pa.schema(
+            [
+                ('scored_at', pa.timestamp('ms', tz='UTC')),
+                ('seq', pa.int64()),
+            ]
+            + [(name, self.feature_type) for name in FEATURE_COLUMNS]
+            + [
+                ('fraud_probability', pa.float32()),
+                ('is_fraud', pa.bool_()),
+                ('anomaly_score', pa.float32()),
+                ('is_anomaly', pa.bool_()),
+                ('model_version', pa.dictionary(pa.int32(), pa.string())),
+            ]
+        )
+        self.file_prefix = f"part-{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+
+        self.lock = threading.Lock()
+        self.chunks = []  # (scored_ms, seq, X, scores) per append()
+        self.buffered = 0
+        self.hour = None
+        self.writer = None
+        self.path = None
+
+    def append(self, seq, X, scores):
+        """Buffer one scored batch: seq and X as decoded, scores from FraudPredictor.score_matrix()."""
+        scored_ms = int(time.time() * 1000)
+        hour = datetime.fromtimestamp(scored_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H')
+        with self.lock:
+            if hour != self.hour:
+                # Buffered rows belong to the previous hour's file
+                self._write()
+                self._close_file()
+                self.hour = hour
+            self.chunks.append((scored_ms, seq, X, scores))
+            self.buffered += len(X)
+            if self.buffered >= self.row_group_rows:
+                self._write()
+
+    def close(self):
+        with self.lock:
+            self._write()
+            self._close_file()
+
+    def _write(self):
+        if not self.buffered:
+            return
+        batch = self._to_batch()
+        self.chunks = []
+        self.buffered = 0
+        if self.writer is None:
+            self._open_file()
+        if self.fmt == "parquet":
+            self.writer.write_batch(batch, row_group_size=batch.num_rows)
+        else:
+            self.writer.write_batch(batch)
+
+    def _to_batch(self):
+        pa = self.pa
+        n = self.buffered
+        scored_ms = np.concatenate([np.full(len(X), ms, dtype=np.int64) for ms, _, X, _ in self.chunks])
+        seq = np.concatenate([s for _, s, _, _ in self.chunks])
+        # Feature-major copy, so each column is one contiguous slice
+        X = np.concatenate([X for _, _, X, _ in self.chunks]).astype(self.feature_type.to_pandas_dtype()).T.copy()
+
+        def score(key, dtype):
+            return np.concatenate([scores[key] for *_, scores in self.chunks]).astype(dtype, copy=False)
+
+        columns = [
+            pa.array(scored_ms, type=pa.timestamp('ms', tz='UTC')),
+            pa.array(seq, mask=seq < 0),  # messages without a sequence number
+        ]
+        columns += [pa.array(column) for column in X]
+        columns += [
+            pa.array(score('fraud_probability', np.float32)),
+            pa.array(score('is_fraud', np.bool_)),
+            pa.array(score('anomaly_score', np.float32)),
+            pa.array(score('is_anomaly', np.bool_)),
+            pa.DictionaryArray.from_arrays(np.zeros(n, dtype=np.int32), [self.model_version]),
+        ]
+        return pa.record_batch(columns, schema=self.schema)
+
+    def _open_file(self):
+        partition = os.path.join(self.directory, f"hour={self.hour}")
+        os.makedirs(partition, exist_ok=True)
+        self.path = os.path.join(partition, f"{self.file_prefix}.{EXTENSIONS[self.fmt]}")
+        in_progress = self._in_progress_path()
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(in_progress, self.schema, compression=self.compression or 'none')
+        else:
+            options = self.pa.ipc.IpcWriteOptions(compression=self.compression)
+            self.writer = self.pa.ipc.new_file(in_progress, self.schema, options=options)
+
+    def _close_file(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        os.replace(self._in_progress_path(), self.path)
+        self.writer = None
+        self.path = None
+
+    def _in_progress_path(self):
+        directory, name = os.path.split(self.path)
+        return os.path.join(directory, f".{name}.inprogress")
@@ -8,7 +8,8 @@ load_dotenv()
 BROKER_MODE = os.getenv("BROKER_MODE", "local")
 
 # Local Redpanda Configuration
-LOCAL_BOOTSTRAP_SERVERS = os.getenv("LOCAL_BOOTSTRAP_SERVERS", "localhost:19092")
+# (KAFKA_BOOTSTRAP_SERVERS is what the Helm/K8s manifests set)
+LOCAL_BOOTSTRAP_SERVERS = os.getenv("LOCAL_BOOTSTRAP_SERVERS", os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:19092"))
 
 # Cloud (Upstash Kafka) Configuration
 CLOUD_BOOTSTRAP_SERVERS = os.getenv("CLOUD_BOOTSTRAP_SERVERS", "")
@@ -23,11 +24,99 @@ TRANSACTIONS_TOPIC = TOPIC_NAME  # Alias for streaming scripts
 RATE_LIMIT = int(os.getenv("RATE_LIMIT", "10"))  # Transactions per second
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "100"))  # Messages before flush
 
+# Producer -> Consumer Transport: 'zmq' (local demo, no broker) or 'kafka' (Redpanda / Kafka)
+TRANSPORT = os.getenv("TRANSPORT", "zmq")
+
+# Kafka Producer Batching (transport=kafka)
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", "5"))  # wait up to T ms to fill a batch
+KAFKA_BATCH_BYTES = int(os.getenv("KAFKA_BATCH_BYTES", "262144"))  # per-partition batch size
+KAFKA_COMPRESSION = os.getenv("KAFKA_COMPRESSION", "none")  # none, gzip, snappy, lz4, zstd
+
+# Kafka Consumer (transport=kafka): replicas in one group split the topic's partitions
+KAFKA_GROUP_ID = os.getenv("KAFKA_GROUP_ID", "sentinel-consumer")
+KAFKA_MAX_POLL_RECORDS = int(os.getenv("KAFKA_MAX_POLL_RECORDS", "5000"))
+
+# Producer -> Consumer Wire Format: 'binary' (multipart header + float payload) or 'json' (debug)
+WIRE_FORMAT = os.getenv("WIRE_FORMAT", "binary")
+WIRE_DTYPE = os.getenv("WIRE_DTYPE", "float32")  # binary payload: 'float32' or 'float64'
+
+# ZeroMQ High-Water Marks: messages queued per socket before PUB/SUB drops (0 = unlimited)
+ZMQ_SNDHWM = int(os.getenv("ZMQ_SNDHWM", "1000"))  # producer PUB
+ZMQ_RCVHWM = int(os.getenv("ZMQ_RCVHWM", "1000"))  # consumer SUB
+
+# Flow Control: 'none' (PUB/SUB drops when full) or 'credit' (producer waits for consumer acks)
+FLOW_CONTROL = os.getenv("FLOW_CONTROL", "none")
+FLOW_CREDIT_WINDOW = int(os.getenv("FLOW_CREDIT_WINDOW", "50000"))  # max unacknowledged messages
+
+# Inference Thresholds
+FRAUD_THRESHOLD = float(os.getenv("FRAUD_THRESHOLD", "0.5"))  # is_fraud when probability > threshold
+ANOMALY_THRESHOLD = float(os.getenv("ANOMALY_THRESHOLD", "0.0"))  # is_anomaly when score < threshold
+
+# Inference Engine: 'sklearn' (library APIs) or 'native' (compiled node arrays)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "sklearn")
+
+# Warm-up rows scored at startup before /health reports healthy (0 = single row only)
+WARMUP_ROWS = int(os.getenv("WARMUP_ROWS", "256"))
+WARMUP_ATTEMPTS = int(os.getenv("WARMUP_ATTEMPTS", "5"))  # Failed tries before /livez fails and the pod restarts
+WARMUP_RETRY_S = float(os.getenv("WARMUP_RETRY_S", "1"))  # Delay before the first retry, doubled after each
+
+# Model Hot-Reload: poll models/VERSION every N seconds (0 = admin endpoint only)
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "10"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # Required as X-Admin-Token on /admin/*; empty disables them
+
+# Inference API Executor (model calls run off the event loop)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))  # Threads running model calls
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))  # Waiting jobs before 503
+
+READY_MAX_QUEUE_DEPTH = int(os.getenv("READY_MAX_QUEUE_DEPTH", "32"))  # /readyz fails at or above this depth
+
+# Inference API Micro-Batching (opt-in)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))  # Max time a request waits for peers
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))  # Max requests scored together
+
+# Inference API Bulk Scoring (/score/arrow, /score/float32)
+SCORE_CHUNK_ROWS = int(os.getenv("SCORE_CHUNK_ROWS", "65536"))  # Rows per model call while streaming
+SCORE_MAX_BATCH_BYTES = int(os.getenv("SCORE_MAX_BATCH_BYTES", str(64 * 1024 * 1024)))  # Largest Arrow record batch accepted (413 above)
+
+# Consumer Micro-Batching: drain up to N queued messages (or wait T ms) per scoring call
+CONSUMER_MAX_BATCH = int(os.getenv("CONSUMER_MAX_BATCH", "256"))
+CONSUMER_MAX_WAIT_MS = float(os.getenv("CONSUMER_MAX_WAIT_MS", "5"))
+
+# Consumer Worker Pool: >1 runs N scoring processes behind a PUSH/PULL fan-out
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "1"))
+
+# Single-process consumer: 'sync' loop, or 'async' staged pipeline (receive, decode, score, persist)
+CONSUMER_PIPELINE = os.getenv("CONSUMER_PIPELINE", "sync")
+CONSUMER_STAGE_QUEUE = int(os.getenv("CONSUMER_STAGE_QUEUE", "8"))  # batches buffered between async stages
+
+# Consumer SQLite Write-Behind Buffer (flush at N rows or T ms, whichever comes first)
+DB_FLUSH_ROWS = int(os.getenv("DB_FLUSH_ROWS", str(BATCH_SIZE)))
+DB_FLUSH_INTERVAL_MS = float(os.getenv("DB_FLUSH_INTERVAL_MS", "250"))
+
+# Consumer Prometheus endpoint for per-stage latency histograms (0 = disabled)
+CONSUMER_METRICS_PORT = int(os.getenv("CONSUMER_METRICS_PORT", "9102"))
+
 # Data Source
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 CSV_PATH = os.getenv("CSV_PATH", os.path.join(DATA_DIR, "creditcard.csv"))
 
+# Consumer columnar archive of scored rows with full features ('none', 'parquet' or 'arrow')
+ARCHIVE_FORMAT = os.getenv("ARCHIVE_FORMAT", "none")
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(DATA_DIR, "archive"))  # hour=YYYY-MM-DDTHH/ partitions
+ARCHIVE_ROW_GROUP_ROWS = int(os.getenv("ARCHIVE_ROW_GROUP_ROWS", "131072"))  # rows buffered per write
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd")  # parquet: zstd, snappy, gzip, none; arrow: zstd, lz4, none
+
+# sentinel.db Retention (background thread; off by default, RETENTION_HOURS=0 keeps everything)
+RETENTION_HOURS = float(os.getenv("RETENTION_HOURS", "0"))  # transactions and per-second rollups
+RETENTION_ROLLUP_DAYS = float(os.getenv("RETENTION_ROLLUP_DAYS", "30"))  # per-minute rollups
+RETENTION_INTERVAL_S = float(os.getenv("RETENTION_INTERVAL_S", "60"))  # time between passes
+RETENTION_CHUNK_ROWS = int(os.getenv("RETENTION_CHUNK_ROWS", "5000"))  # rows per delete transaction
+RETENTION_EXPORT = os.getenv("RETENTION_EXPORT", "none")  # 'parquet' writes expired rows out before deleting
+RETENTION_EXPORT_DIR = os.getenv("RETENTION_EXPORT_DIR", os.path.join(DATA_DIR, "expired"))
+RETENTION_EXPORT_FILE_ROWS = int(os.getenv("RETENTION_EXPORT_FILE_ROWS", "1000000"))  # max rows per exported file
+
 # Broker URL alias for scripts
 KAFKA_BROKER_URL = LOCAL_BOOTSTRAP_SERVERS
 
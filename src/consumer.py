@@ -2,75 +2,823 @@
 Sentinel Stream - Fraud Detection Consumer (ZeroMQ Version)
 Consumes transactions, runs inference, and saves to SQLite.
 """
-import json
+import math
+import time
+import asyncio
+import signal
 import sqlite3
-import pandas as pd
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import zmq
+import zmq.asyncio
 import sys
 import os
 
 # Fix Import Path for 'src' module
 sys.path.append(os.getcwd())
 
+from prometheus_client import REGISTRY, Counter, Gauge, start_http_server
+from prometheus_client.core import HistogramMetricFamily
+from prometheus_client.utils import floatToGoString
+
 from src.model.predictor import FraudPredictor
-from src.config import TRANSACTIONS_TOPIC
+from src.wire import decode_batch, decode_records
+from src.transport import TRANSPORTS, create_kafka_consumer
+from src.archive import create_archive
+from src import rollup
+from src.retention import enable_incremental_vacuum, start_retention, stop_retention
+from src.flow import FLOW_MODES, IDLE_INTERVAL_MS, CreditSender, window_hwm
+from src.config import (
+    TRANSACTIONS_TOPIC, FRAUD_THRESHOLD, ANOMALY_THRESHOLD, INFERENCE_ENGINE,
+    DB_FLUSH_ROWS, DB_FLUSH_INTERVAL_MS, CONSUMER_MAX_BATCH, CONSUMER_MAX_WAIT_MS,
+    CONSUMER_WORKERS, CONSUMER_PIPELINE, CONSUMER_STAGE_QUEUE, CONSUMER_METRICS_PORT, ZMQ_RCVHWM, FLOW_CONTROL, FLOW_CREDIT_WINDOW,
+    TRANSPORT, KAFKA_MAX_POLL_RECORDS, RETENTION_HOURS
+)
 
 DB_PATH = "sentinel.db"
 ZMQ_PORT = 5555
 
+# Worker pool: distributor PUSHes work to workers, workers PUSH scored rows to the writer
+POOL_WORK_ADDR = "tcp://127.0.0.1:5556"
+POOL_RESULTS_ADDR = "tcp://127.0.0.1:5557"
+
+# Single-process pipelines: sequential loop, or overlapped asyncio stages
+PIPELINES = ('sync', 'async')
+
+# Async receive stage re-checks for shutdown this often while the socket is quiet
+RECEIVE_TICK_MS = 200
+
+# Per-stage timings stored next to the end-to-end latency_ms (added to older databases by init_db)
+STAGE_COLUMNS = [
+    ("seq", "INTEGER"),
+    ("queue_ms", "REAL"),
+    ("parse_ms", "REAL"),
+    ("inference_ms", "REAL"),
+    ("db_write_ms", "REAL"),
+]
+
+INSERT_SQL = (
+    "INSERT INTO transactions (amount, fraud_prob, is_fraud, latency_ms, "
+    "seq, queue_ms, parse_ms, inference_ms, db_write_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Loss accounting (exported with the latency histograms)
+MESSAGES_RECEIVED = Counter('consumer_messages_received_total', 'Messages taken off the ZeroMQ socket')
+MESSAGES_SCORED = Counter('consumer_messages_scored_total', 'Messages scored by the model')
+MESSAGES_DROPPED = Counter(
+    'consumer_messages_dropped_total',
+    'Messages published but never received (producer sequence gaps)'
+)
+CONSUMER_LAG = Gauge('consumer_lag_seconds', 'Age of the newest message in the last scored batch')
+STAGE_QUEUE_DEPTH = Gauge('consumer_stage_queue_depth', 'Batches waiting in front of each async pipeline stage', ['stage'])
+KAFKA_LAG = Gauge('consumer_kafka_lag_messages', 'Records behind the partition high watermark', ['partition'])
+
+# HDR-style log-linear buckets (seconds): 1-1.5-2-3-5-7 per decade from 10us to 10s
+LATENCY_BUCKETS = [m * 10.0 ** e for e in range(-5, 1) for m in (1, 1.5, 2, 3, 5, 7)] + [10.0]
+
+class StageLatencyHistograms:
+    """
+    Per-stage latency histograms exported as consumer_stage_latency_seconds{stage}.
+    
+    Stages: queue (producer send -> batch received), parse, inference,
+    db_write (scored -> its flush starts), commit (executemany + COMMIT) and
+    end_to_end. Values are recorded a whole flush at a time with NumPy, so
+    the cost does not grow with one Python call per message per stage.
+    """
+    STAGES = ("queue", "parse", "inference", "db_write", "commit", "end_to_end")
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = np.asarray(buckets, dtype=np.float64)
+        self.counts = {stage: np.zeros(len(self.bounds) + 1, dtype=np.int64) for stage in self.STAGES}
+        self.sums = dict.fromkeys(self.STAGES, 0.0)
+        self.lock = threading.Lock()  # collect() runs on the HTTP server thread
+    
+    def observe(self, stage, seconds):
+        values = np.asarray(seconds, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        # side='left' gives Prometheus "le" semantics: bounds[i-1] < v <= bounds[i]
+        counts = np.bincount(np.searchsorted(self.bounds, values, side='left'), minlength=len(self.bounds) + 1)
+        with self.lock:
+            self.counts[stage] += counts
+            self.sums[stage] += float(values.sum())
+    
+    def collect(self):
+        family = HistogramMetricFamily(
+            'consumer_stage_latency_seconds',
+            'Per-message latency of each consumer stage',
+            labels=['stage']
+        )
+        with self.lock:
+            for stage in self.STAGES:
+                cumulative = np.cumsum(self.counts[stage]).tolist()
+                buckets = [(floatToGoString(b), c) for b, c in zip(self.bounds.tolist(), cumulative)]
+                buckets.append(('+Inf', cumulative[-1]))
+                family.add_metric([stage], buckets, self.sums[stage])
+        yield family
+
+def start_metrics_server(port=CONSUMER_METRICS_PORT):
+    """Register the latency histograms and serve /metrics (None if disabled)."""
+    if not port:
+        return None
+    latency = StageLatencyHistograms()
+    REGISTRY.register(latency)
+    # Keep SIGTERM/SIGINT on the main thread: delivered to the server thread they
+    # would not interrupt the main thread's blocking poll and shutdown would hang
+    stop_signals = {signal.SIGTERM, signal.SIGINT}
+    if hasattr(signal, 'pthread_sigmask'):
+        signal.pthread_sigmask(signal.SIG_BLOCK, stop_signals)
+    try:
+        start_http_server(port)
+    finally:
+        if hasattr(signal, 'pthread_sigmask'):
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, stop_signals)
+    print(f"📈 Metrics on :{port}/metrics")
+    return latency
+
+class SequenceTracker:
+    """
+    Counts messages lost between producer and consumer from gaps in the
+    producer's sequence numbers.
+    
+    Sequence numbers up to (highest seen - reorder_window) are settled: any
+    number in that range that never arrived is counted once as dropped. A
+    reorder window > 0 tolerates out-of-order arrival from the worker pool.
+    Counting starts at the first message seen (joining mid-stream is not a
+    loss); a number far below the settled range means the producer restarted.
+    """
+    def __init__(self, reorder_window=0):
+        self.reorder_window = reorder_window
+        self.settled = None  # every seq <= settled is accounted for
+        self.high = None
+        self.pending = np.empty(0, dtype=np.int64)
+    
+    def update(self, seqs):
+        """Record a batch of sequence numbers (None = unstamped), return newly dropped."""
+        seqs = np.array([seq for seq in seqs if seq is not None], dtype=np.int64)
+        if not len(seqs):
+            return 0
+        if self.settled is None or seqs.min() < self.settled - self.reorder_window:
+            self.settled = self.high = int(seqs.min()) - 1
+            self.pending = np.empty(0, dtype=np.int64)
+        self.high = max(self.high, int(seqs.max()))
+        # Late arrivals at or below `settled` were already counted as dropped
+        self.pending = np.concatenate([self.pending, seqs[seqs > self.settled]])
+        return self._settle(self.high - self.reorder_window)
+    
+    def finish(self):
+        """Settle everything seen so far (on shutdown), return newly dropped."""
+        return self._settle(self.high) if self.high is not None else 0
+    
+    def _settle(self, upto):
+        if upto <= self.settled:
+            return 0
+        done = self.pending <= upto
+        arrived = len(np.unique(self.pending[done]))
+        dropped = (upto - self.settled) - arrived
+        self.pending = self.pending[~done]
+        self.settled = upto
+        return dropped
+
+class StreamStats:
+    """
+    Received / scored / dropped / lag accounting for the process that writes
+    scored rows, plus credit acks to the producer when flow control is on.
+    reorder_window=None turns gap detection off (Kafka: the broker doesn't
+    drop, and each group member only sees its own partitions' messages).
+    """
+    def __init__(self, reorder_window=0, credits=None):
+        self.tracker = SequenceTracker(reorder_window) if reorder_window is not None else None
+        self.credits = credits
+        self.received = self.scored = self.dropped = 0
+    
+    def record(self, received, rows):
+        self.received += received
+        self.scored += len(rows)
+        MESSAGES_RECEIVED.inc(received)
+        MESSAGES_SCORED.inc(len(rows))
+        
+        if self.tracker is not None:
+            self._count_dropped(self.tracker.update(row[3] for row in rows))
+        queue_ms = [row[4] for row in rows if row[4] is not None]
+        if queue_ms:
+            CONSUMER_LAG.set(min(queue_ms) / 1000)
+        if self.credits is not None and self.tracker.high is not None:
+            self.credits.ack(self.tracker.high)
+    
+    def idle(self):
+        """No messages for a while: release the producer's outstanding credits."""
+        if self.credits is not None:
+            self.credits.idle()
+    
+    def summary(self):
+        if self.tracker is not None:
+            self._count_dropped(self.tracker.finish())
+        print(f"📊 Received {self.received}, scored {self.scored}, dropped {self.dropped}")
+    
+    def _count_dropped(self, dropped):
+        if dropped > 0:
+            self.dropped += dropped
+            MESSAGES_DROPPED.inc(dropped)
+            print(f"⚠️  {dropped} messages lost before reaching the consumer ({self.dropped} total)")
+
+def create_stats(context, reorder_window=0):
+    """StreamStats for the writer process, with a credit back channel if FLOW_CONTROL=credit."""
+    if FLOW_CONTROL not in FLOW_MODES:
+        raise ValueError(f"Unknown FLOW_CONTROL '{FLOW_CONTROL}', expected one of {FLOW_MODES}")
+    credits = CreditSender(context) if FLOW_CONTROL == "credit" else None
+    return StreamStats(reorder_window, credits)
+
+def poll_timeout(buffer, stats):
+    """Wake up for a pending flush, and to report idleness when credits are in use."""
+    timeout = buffer.timeout_ms()
+    if stats.credits is not None:
+        timeout = IDLE_INTERVAL_MS if timeout is None else min(timeout, IDLE_INTERVAL_MS)
+    return timeout
+
+def finalize_row(row, flush_ns):
+    """
+    Turn a scored row into an INSERT_SQL row, adding the write-behind time and
+    the end-to-end latency_ms (producer send -> flush start; queue is unknown
+    for messages without a send stamp).
+    """
+    amount, prob, fraud, seq, queue_ms, parse_ms, inference_ms, scored_ns = row
+    db_write_ms = (flush_ns - scored_ns) / 1e6
+    latency_ms = (queue_ms or 0.0) + parse_ms + inference_ms + db_write_ms
+    return (amount, prob, fraud, latency_ms, seq, queue_ms, parse_ms, inference_ms, db_write_ms)
+
+def connect_db(path=DB_PATH):
+    """Open a connection with pragmas tuned for a single streaming writer."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    # WAL: readers (dashboard) don't block the writer; NORMAL is durable at checkpoints
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+    conn.execute("PRAGMA busy_timeout=5000")
+    rollup.register(conn)
+    return conn
+
+class WriteBuffer:
+    """
+    Write-behind buffer for scored rows.
+    
+    Rows are held in memory and written with one executemany() inside one
+    transaction when max_rows is reached or max_interval_ms has passed since
+    the oldest buffered row, so the fsync cost is paid per batch, not per row.
+    The rollup tables (src/rollup.py) are updated in the same transaction.
+    """
+    def __init__(self, conn, max_rows=DB_FLUSH_ROWS, max_interval_ms=DB_FLUSH_INTERVAL_MS, latency=None, on_flush=None):
+        self.conn = conn
+        self.latency = latency
+        self.on_flush = on_flush  # called once rows are committed (e.g. to commit Kafka offsets)
+        self.max_rows = max_rows
+        self.max_interval = max_interval_ms / 1000
+        self.rows = []
+        self.oldest = None
+    
+    def extend(self, rows, flush=True):
+        """Buffer rows; with flush=False the caller checks due() and flushes itself."""
+        if not self.rows:
+            self.oldest = time.monotonic()
+        self.rows.extend(rows)
+        if flush and len(self.rows) >= self.max_rows:
+            self.flush()
+    
+    def due(self):
+        """True when the buffer is full or its oldest row has waited max_interval_ms."""
+        return bool(self.rows) and (len(self.rows) >= self.max_rows or self.timeout_ms() == 0)
+    
+    def timeout_ms(self):
+        """Milliseconds until a time-based flush is due, or None if the buffer is empty."""
+        if not self.rows:
+            return None
+        return max(0, math.ceil((self.oldest + self.max_interval - time.monotonic()) * 1000))
+    
+    def maybe_flush(self):
+        if self.rows and self.timeout_ms() == 0:
+            self.flush()
+    
+    def flush(self):
+        if not self.rows:
+            return
+        flush_ns = time.monotonic_ns()
+        rows = [finalize_row(row, flush_ns) for row in self.rows]
+        with self.conn:  # one transaction, committed on exit
+            self.conn.executemany(INSERT_SQL, rows)
+            rollup.update_rollups(self.conn, rows)
+        commit_s = (time.monotonic_ns() - flush_ns) / 1e9
+        self.rows = []
+        self.oldest = None
+        if self.on_flush is not None:
+            self.on_flush()
+        if self.latency is not None:
+            self.record_latency(rows, commit_s)
+    
+    def record_latency(self, rows, commit_s):
+        # Columns 3..8 of an INSERT row: latency, seq, queue, parse, inference, db_write (ms)
+        ms = np.array([row[3:] for row in rows], dtype=np.float64)
+        seconds = ms / 1000
+        self.latency.observe("queue", seconds[:, 2])
+        self.latency.observe("parse", seconds[:, 3])
+        self.latency.observe("inference", seconds[:, 4])
+        self.latency.observe("db_write", seconds[:, 5])
+        self.latency.observe("commit", np.full(len(rows), commit_s))
+        self.latency.observe("end_to_end", seconds[:, 0] + commit_s)
+
+def receive_batch(socket, timeout_ms, max_batch=CONSUMER_MAX_BATCH, max_wait_ms=CONSUMER_MAX_WAIT_MS):
+    """
+    Wait up to timeout_ms (None = forever) for one message, then drain whatever
+    else is queued without blocking, waiting at most max_wait_ms for more,
+    until max_batch messages are collected. Each message is its list of frames.
+    """
+    messages = []
+    if not socket.poll(timeout=timeout_ms):
+        return messages
+    
+    deadline = time.monotonic() + max_wait_ms / 1000
+    while len(messages) < max_batch:
+        try:
+            messages.append(socket.recv_multipart(zmq.NOBLOCK))
+        except zmq.Again:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not socket.poll(timeout=math.ceil(remaining * 1000)):
+                break
+    return messages
+
+def load_predictor():
+    print("🤖 Loading Fraud Model...")
+    return FraudPredictor(
+        fraud_threshold=FRAUD_THRESHOLD,
+        anomaly_threshold=ANOMALY_THRESHOLD,
+        engine=INFERENCE_ENGINE
+    )
+
+def connect_producer(context):
+    """SUB socket on the producer's PUB stream."""
+    socket = context.socket(zmq.SUB)
+    # Must be set before connect; with credits the queue has to hold a whole window
+    hwm = window_hwm(ZMQ_RCVHWM, FLOW_CREDIT_WINDOW) if FLOW_CONTROL == "credit" else ZMQ_RCVHWM
+    socket.setsockopt(zmq.RCVHWM, hwm)
+    socket.connect(f"tcp://localhost:{ZMQ_PORT}")
+    socket.setsockopt_string(zmq.SUBSCRIBE, TRANSACTIONS_TOPIC)
+    return socket
+
+def score_batch(predictor, messages, archive=None):
+    """
+    Decode a batch of messages (binary or json, see src/wire.py) and score
+    them in one vectorized call.
+    
+    Returns scored rows (amount, prob, is_fraud, seq, queue_ms, parse_ms,
+    inference_ms, scored_ns); finalize_row() completes them at flush time.
+    Parse and inference times are the batch's, which is what each message waits.
+    """
+    received_ns = time.monotonic_ns()
+    seq, sent_ns, X = decode_batch(messages)
+    parse_ms = (time.monotonic_ns() - received_ns) / 1e6
+    queue_ms = np.where(sent_ns >= 0, (received_ns - sent_ns) / 1e6, np.nan)
+    return score_rows(predictor, seq, queue_ms, X, parse_ms, archive)
+
+def score_records(predictor, records, received_ms, archive=None):
+    """
+    score_batch() for Kafka records. Queue time comes from the record's
+    CreateTime (epoch ms): the producer's monotonic stamp is only
+    comparable on the same host, and Kafka clients usually aren't.
+    """
+    started_ns = time.monotonic_ns()
+    seq, _, X = decode_records([record.value for record in records])
+    parse_ms = (time.monotonic_ns() - started_ns) / 1e6
+    queue_ms = received_ms - np.array([record.timestamp for record in records], dtype=np.float64)
+    return score_rows(predictor, seq, queue_ms, X, parse_ms, archive)
+
+def score_rows(predictor, seq, queue_ms, X, parse_ms, archive=None):
+    """
+    Score a decoded batch in one vectorized call (queue_ms per message,
+    parse_ms per batch). With an archive, the full feature rows and scores
+    are buffered for the columnar files as well.
+    """
+    parsed_ns = time.monotonic_ns()
+    scores = predictor.score_matrix(X)
+    scored_ns = time.monotonic_ns()
+    if archive is not None:
+        archive.append(seq, X, scores)
+    
+    inference_ms = (scored_ns - parsed_ns) / 1e6
+    # float32 payloads carry amounts to ~7 digits; the producer sends cents
+    amounts = np.round(X[:, -1].astype(np.float64), 2)
+    return [
+        (amount, prob, fraud, s if s >= 0 else None, q if q == q else None, parse_ms, inference_ms, scored_ns)
+        for amount, prob, fraud, s, q in zip(
+            amounts.tolist(), scores['fraud_probability'].tolist(), scores['is_fraud'].tolist(),
+            seq.tolist(), queue_ms.tolist()
+        )
+    ]
+
+def report_frauds(rows):
+    for amount, prob, fraud, *_ in rows:
+        if fraud:
+            print(f"🚨 FRAUD DETECTED! ${amount:.2f} (Risk: {prob:.1%})")
+
 def init_db():
     conn = sqlite3.connect(DB_PATH)
+    # Lets retention return deleted pages to the filesystem a chunk at a time; only
+    # takes effect on a new database, converting an existing one is an offline VACUUM
+    if not enable_incremental_vacuum(conn) and RETENTION_HOURS > 0:
+        print(f"⚠️  {DB_PATH} predates incremental auto-vacuum: expired rows free pages for reuse, "
+              f"but the file won't shrink until 'python -m src.retention --convert {DB_PATH}' (consumer stopped)")
+    # WAL is persistent in the database file, set once here
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_schema(conn)
+    conn.commit()
+    conn.close()
+    print("📦 Database initialized")
+
+def create_schema(conn):
+    """Create (or migrate) the transactions table, its index and the rollup tables."""
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS transactions
                  (timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, 
                   amount REAL, 
                   fraud_prob REAL, 
                   is_fraud BOOLEAN,
-                  latency_ms REAL)''')
-    conn.commit()
-    conn.close()
-    print("📦 Database initialized")
+                  latency_ms REAL,
+                  seq INTEGER,
+                  queue_ms REAL,
+                  parse_ms REAL,
+                  inference_ms REAL,
+                  db_write_ms REAL)''')
+    # Databases created before per-stage timings existed
+    existing = {row[1] for row in c.execute("PRAGMA table_info(transactions)")}
+    for name, col_type in STAGE_COLUMNS:
+        if name not in existing:
+            c.execute(f"ALTER TABLE transactions ADD COLUMN {name} {col_type}")
+    # Time-range reads (dashboard, rollups, retention) without a full table scan
+    c.execute("CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions(timestamp)")
+    rollup.create_tables(c)
 
 def consume_loop():
     # Load Model
-    print("🤖 Loading Fraud Model...")
-    predictor = FraudPredictor()
+    predictor = load_predictor()
+    archive = create_archive(predictor.version)
     
     # Connect ZeroMQ
     print("🔌 Connecting to ZeroMQ Producer...")
     context = zmq.Context()
-    socket = context.socket(zmq.SUB)
-    socket.connect(f"tcp://localhost:{ZMQ_PORT}")
-    socket.setsockopt_string(zmq.SUBSCRIBE, TRANSACTIONS_TOPIC)
+    socket = connect_producer(context)
     
     print("✅ Consumer active. Waiting for transactions...")
     
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    cursor = conn.cursor()
+    conn = connect_db()
+    retention = start_retention(DB_PATH)
+    buffer = WriteBuffer(conn, latency=start_metrics_server())
+    stats = create_stats(context)
     
     try:
         while True:
-            # Receive
-            msg = socket.recv_string()
-            _, json_str = msg.split(" ", 1)
-            tx = json.loads(json_str)
+            # Receive everything available, but wake up in time for a pending flush
+            messages = receive_batch(socket, poll_timeout(buffer, stats))
             
-            # Predict
-            result = predictor.predict(tx)
+            if messages:
+                # Predict (one model call for the whole batch)
+                rows = score_batch(predictor, messages, archive)
+                
+                # Save to DB (buffered, flushed in batches)
+                buffer.extend(rows)
+                report_frauds(rows)
+                stats.record(len(messages), rows)
+            elif buffer.timeout_ms() is None:
+                stats.idle()
             
-            # Save to DB
-            cursor.execute("INSERT INTO transactions (amount, fraud_prob, is_fraud, latency_ms) VALUES (?, ?, ?, ?)",
-                           (tx['amount'], result['fraud_probability'], result['is_fraud'], 15.5))
-            conn.commit()
+            buffer.maybe_flush()
             
-            if result['is_fraud']:
-                print(f"🚨 FRAUD DETECTED! ${tx['amount']:.2f} (Risk: {result['fraud_probability']:.1%})")
+    except KeyboardInterrupt:
+        print("\n🛑 Consumer stopped")
+    finally:
+        ignore_stop_signals()
+        buffer.flush()
+        stop_retention(retention)
+        conn.close()
+        close_archive(archive)
+        stats.summary()
+
+def close_archive(archive):
+    if archive is not None:
+        archive.close()
+
+async def receive_batch_async(socket, timeout_ms, max_batch=CONSUMER_MAX_BATCH, max_wait_ms=CONSUMER_MAX_WAIT_MS):
+    """receive_batch() for a zmq.asyncio socket: awaits instead of blocking the event loop."""
+    messages = []
+    if not await socket.poll(timeout=timeout_ms):
+        return messages
+    
+    deadline = time.monotonic() + max_wait_ms / 1000
+    while len(messages) < max_batch:
+        try:
+            # Completes immediately with NOBLOCK, so no event-loop round trip per message
+            messages.append(await socket.recv_multipart(zmq.NOBLOCK))
+        except zmq.Again:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await socket.poll(timeout=math.ceil(remaining * 1000)):
+                break
+    return messages
+
+def decode_timed(messages, received_ns):
+    """
+    Decode stage of the async pipeline. queue_ms runs from the producer's send
+    to the start of decoding, so it includes the wait in the decode queue.
+    Returns (seq, queue_ms, X, parse_ms, decoded_ns).
+    """
+    started_ns = time.monotonic_ns()
+    seq, sent_ns, X = decode_batch(messages)
+    decoded_ns = time.monotonic_ns()
+    queue_ms = np.where(sent_ns >= 0, (started_ns - sent_ns) / 1e6, np.nan)
+    return seq, queue_ms, X, (decoded_ns - started_ns) / 1e6, decoded_ns
+
+async def async_consume_loop():
+    """
+    Staged asyncio pipeline: receive -> decode -> score -> persist, joined by
+    bounded queues of CONSUMER_STAGE_QUEUE batches. Decoding, scoring and
+    SQLite flushes each run in their own executor thread, so the socket is
+    drained while a batch is scored and the next batch is scored while the
+    previous one is committed. A full queue makes the stage in front of it
+    wait, which pushes back to the ZeroMQ high-water mark.
+    """
+    predictor = load_predictor()
+    archive = create_archive(predictor.version)
+    
+    print("🔌 Connecting to ZeroMQ Producer...")
+    context = zmq.asyncio.Context()
+    socket = connect_producer(context)
+    # Credit acks are fire-and-forget NOBLOCK sends from plain (non-async) code
+    credit_context = zmq.Context()
+    
+    conn = connect_db()
+    retention = start_retention(DB_PATH)
+    buffer = WriteBuffer(conn, latency=start_metrics_server())
+    stats = create_stats(credit_context)
+    
+    queues = {stage: asyncio.Queue(CONSUMER_STAGE_QUEUE) for stage in ('decode', 'score', 'persist')}
+    for stage, queue in queues.items():
+        STAGE_QUEUE_DEPTH.labels(stage=stage).set_function(queue.qsize)
+    executors = {stage: ThreadPoolExecutor(max_workers=1, thread_name_prefix=stage) for stage in ('decode', 'score', 'db')}
+    in_flight = 0  # batches received but not yet buffered for the DB
+    
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    
+    async def receive():
+        nonlocal in_flight
+        while not stop.is_set():
+            messages = await receive_batch_async(socket, RECEIVE_TICK_MS)
+            if messages:
+                in_flight += 1
+                await queues['decode'].put((len(messages), messages, time.monotonic_ns()))
+        await queues['decode'].put(None)
+    
+    async def decode():
+        while (item := await queues['decode'].get()) is not None:
+            received, messages, received_ns = item
+            decoded = await loop.run_in_executor(executors['decode'], decode_timed, messages, received_ns)
+            await queues['score'].put((received, *decoded))
+        await queues['score'].put(None)
+    
+    async def score():
+        while (item := await queues['score'].get()) is not None:
+            received, seq, queue_ms, X, parse_ms, decoded_ns = item
+            # Time spent in the score queue is queueing too
+            queue_ms = queue_ms + (time.monotonic_ns() - decoded_ns) / 1e6
+            rows = await loop.run_in_executor(executors['score'], score_rows, predictor, seq, queue_ms, X, parse_ms, archive)
+            await queues['persist'].put((received, rows))
+        await queues['persist'].put(None)
+    
+    async def persist():
+        nonlocal in_flight
+        while True:
+            timeout = poll_timeout(buffer, stats)
+            try:
+                item = await asyncio.wait_for(queues['persist'].get(), None if timeout is None else timeout / 1000)
+            except asyncio.TimeoutError:
+                if buffer.timeout_ms() is None and in_flight == 0:
+                    stats.idle()
+            else:
+                if item is None:
+                    break
+                received, rows = item
+                in_flight -= 1
+                buffer.extend(rows, flush=False)
+                report_frauds(rows)
+                stats.record(received, rows)
+            
+            if buffer.due():
+                await loop.run_in_executor(executors['db'], buffer.flush)
+    
+    print("✅ Consumer active (async pipeline). Waiting for transactions...")
+    
+    tasks = [asyncio.create_task(stage()) for stage in (receive, decode, score, persist)]
+    try:
+        # A stop signal drains the pipeline: receive stops, the end marker flows through every stage
+        await asyncio.gather(*tasks)
+        print("\n🛑 Consumer stopped")
+    finally:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(signum)
+        ignore_stop_signals()
+        for task in tasks:
+            task.cancel()
+        for executor in executors.values():
+            executor.shutdown()
+        buffer.flush()
+        stop_retention(retention)
+        conn.close()
+        close_archive(archive)
+        stats.summary()
+        context.destroy(linger=0)
+        credit_context.destroy(linger=0)
+
+def init_child():
+    """Children exit on the parent's terminate() and never block on unsent messages."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    context = zmq.Context()
+    context.setsockopt(zmq.LINGER, 0)
+    return context
+
+def distributor_process():
+    """Fan the producer's PUB stream out to workers over PUSH (each message to one worker)."""
+    context = init_child()
+    frontend = connect_producer(context)
+    backend = context.socket(zmq.PUSH)
+    backend.bind(POOL_WORK_ADDR)
+    try:
+        zmq.proxy(frontend, backend)
+    except KeyboardInterrupt:
+        pass
+
+def worker_process(worker_id):
+    """Score micro-batches pulled from the distributor and push the rows to the writer."""
+    context = init_child()
+    predictor = load_predictor()
+    archive = create_archive(predictor.version)
+    if archive is not None:
+        # Unwind on the parent's terminate() so the open archive file is finalized
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    
+    # Connect only once the model is loaded, so PUSH doesn't queue work for a cold worker
+    work = context.socket(zmq.PULL)
+    work.connect(POOL_WORK_ADDR)
+    results = context.socket(zmq.PUSH)
+    results.connect(POOL_RESULTS_ADDR)
+    print(f"✅ Worker {worker_id} ready")
+    
+    try:
+        while True:
+            messages = receive_batch(work, None)
+            if messages:
+                results.send_json({"received": len(messages), "rows": score_batch(predictor, messages, archive)})
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        close_archive(archive)
+
+def run_pool(n_workers):
+    """
+    Multi-process consumer: one distributor, n_workers scoring processes (each
+    with its own FraudPredictor) and this process as the single DB writer.
+    """
+    print(f"🧵 Starting consumer pool with {n_workers} workers...")
+    processes = [multiprocessing.Process(target=distributor_process, name="distributor", daemon=True)]
+    processes += [
+        multiprocessing.Process(target=worker_process, args=(i,), name=f"worker-{i}", daemon=True)
+        for i in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    
+    # Context is created after the children start, never inherited across fork
+    context = zmq.Context()
+    results = context.socket(zmq.PULL)
+    results.bind(POOL_RESULTS_ADDR)
+    
+    conn = connect_db()
+    retention = start_retention(DB_PATH)
+    buffer = WriteBuffer(conn, latency=start_metrics_server())
+    # PUSH deals messages round-robin, so results arrive out of order by as much
+    # as the workers drift apart; leave room for several batches per worker
+    stats = create_stats(context, reorder_window=16 * n_workers * CONSUMER_MAX_BATCH)
+    
+    try:
+        while True:
+            if results.poll(timeout=poll_timeout(buffer, stats)):
+                # Drain every result batch that is already waiting
+                while True:
+                    try:
+                        result = results.recv_json(zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    rows = [tuple(row) for row in result["rows"]]
+                    buffer.extend(rows)
+                    report_frauds(rows)
+                    stats.record(result["received"], rows)
+            elif buffer.timeout_ms() is None:
+                stats.idle()
+            buffer.maybe_flush()
+    except KeyboardInterrupt:
+        print("\n🛑 Consumer pool stopped")
+    finally:
+        # A group-wide SIGTERM reaches us more than once
+        ignore_stop_signals()
+        for process in processes:
+            process.terminate()
+        buffer.flush()
+        stop_retention(retention)
+        conn.close()
+        stats.summary()
+
+def kafka_consume_loop(kafka_consumer=None):
+    """
+    Kafka transport: batched poll of up to KAFKA_MAX_POLL_RECORDS, each
+    partition's records scored in parallel, offsets committed only after the
+    rows are committed to SQLite (at-least-once). Scale out by running more
+    replicas with the same KAFKA_GROUP_ID, up to one per partition.
+    """
+    predictor = load_predictor()
+    archive = create_archive(predictor.version)
+    
+    conn = connect_db()
+    retention = start_retention(DB_PATH)
+    buffer = WriteBuffer(conn, latency=start_metrics_server())
+    stats = StreamStats(reorder_window=None)
+    
+    print("🔌 Connecting to Kafka...")
+    # Flush (and so commit) what we already scored before partitions move to another replica
+    consumer = kafka_consumer or create_kafka_consumer(on_revoke=lambda partitions: buffer.flush())
+    # Every record polled so far is in the buffer whenever it flushes, so the consumer's
+    # current positions are exactly what is durable
+    buffer.on_flush = consumer.commit
+    scorers = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="score")
+    
+    print("✅ Consumer active. Waiting for transactions...")
+    
+    try:
+        while True:
+            timeout = buffer.timeout_ms()
+            batches = consumer.poll(timeout_ms=1000 if timeout is None else timeout, max_records=KAFKA_MAX_POLL_RECORDS)
+            
+            if batches:
+                received_ms = time.time() * 1000
+                futures = {
+                    tp: scorers.submit(score_records, predictor, records, received_ms, archive)
+                    for tp, records in batches.items()
+                }
+                # Extend once with every partition's rows, so a size-triggered flush
+                # never commits positions of records that aren't buffered yet
+                rows = [row for future in futures.values() for row in future.result()]
+                buffer.extend(rows)
+                report_frauds(rows)
+                stats.record(len(rows), rows)
+                
+                for tp, records in batches.items():
+                    highwater = consumer.highwater(tp)
+                    if highwater is not None:
+                        KAFKA_LAG.labels(partition=str(tp.partition)).set(highwater - records[-1].offset - 1)
+            
+            buffer.maybe_flush()
             
     except KeyboardInterrupt:
         print("\n🛑 Consumer stopped")
     finally:
+        ignore_stop_signals()
+        scorers.shutdown()
+        buffer.flush()
+        stop_retention(retention)
         conn.close()
+        consumer.close(autocommit=False)
+        close_archive(archive)
+        stats.summary()
+
+def handle_sigterm(signum, frame):
+    # Kubernetes stops pods with SIGTERM; unwind like Ctrl+C so buffered rows are flushed
+    raise KeyboardInterrupt
+
+def ignore_stop_signals():
+    # Shutting down: a repeated SIGTERM/SIGINT must not interrupt the final flush and close
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_IGN)
 
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, handle_sigterm)
     init_db()
-    consume_loop()
+    if TRANSPORT not in TRANSPORTS:
+        raise ValueError(f"Unknown TRANSPORT '{TRANSPORT}', expected one of {TRANSPORTS}")
+    if TRANSPORT == "kafka":
+        kafka_consume_loop()
+    elif CONSUMER_WORKERS > 1:
+        run_pool(CONSUMER_WORKERS)
+    elif CONSUMER_PIPELINE not in PIPELINES:
+        raise ValueError(f"Unknown CONSUMER_PIPELINE '{CONSUMER_PIPELINE}', expected one of {PIPELINES}")
+    elif CONSUMER_PIPELINE == "async":
+        asyncio.run(async_consume_loop())
+    else:
+        consume_loop()
@@ -9,6 +9,13 @@ import time
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
+import sys
+import os
+
+# Fix Import Path for 'src' module (streamlit puts only src/ on the path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rollup import LATENCY_BOUNDS_MS, PROB_BINS, merge_hists, quantile
 
 st.set_page_config(page_title="Sentinel Commander", page_icon="🦅", layout="wide", initial_sidebar_state="collapsed")
 
@@ -38,18 +45,110 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 DB_PATH = "sentinel.db"
+WINDOW_ROWS = 2000  # rolling window of recent transactions kept per session
+HISTORY_MINUTES = 360  # per-minute rollups charted and summarized in the tiles
+LIVE_SECONDS = 300  # per-second rollups for the live throughput chart
+LATENCY_SECONDS = 60  # "Live Latency" tile
+COLUMNS = "rowid, timestamp, amount, fraud_prob, is_fraud, latency_ms"
+
+def connect():
+    """One read-only connection per session (never takes the consumer's write lock)."""
+    if 'conn' not in st.session_state:
+        st.session_state.conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+    return st.session_state.conn
+
+def reset_window():
+    st.session_state.window = pd.DataFrame()
+    st.session_state.last_rowid = 0
+    st.session_state.view = None
+
+def fetch_new_rows(last_rowid):
+    """Rows written after last_rowid, at most the newest WINDOW_ROWS, oldest first (rowid is the primary key, no scan)."""
+    conn = connect()
+    newest = conn.execute("SELECT max(rowid) FROM transactions").fetchone()[0] or 0
+    if newest < last_rowid:
+        # Database was recreated: start over
+        reset_window()
+        last_rowid = 0
+    df = pd.read_sql_query(
+        f"SELECT {COLUMNS} FROM transactions WHERE rowid > ? ORDER BY rowid DESC LIMIT ?",
+        conn, params=(last_rowid, WINDOW_ROWS)
+    )
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df.iloc[::-1].reset_index(drop=True)
 
 def load_data():
+    """
+    Append rows newer than the last seen rowid to the session's rolling window
+    (used for the scatter and the fraud list). Returns True if anything changed.
+    """
+    if 'window' not in st.session_state:
+        reset_window()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        # Get last 2000 transactions
-        df = pd.read_sql_query("SELECT * FROM transactions ORDER BY timestamp DESC LIMIT 2000", conn)
-        conn.close()
-        # Convert timestamp
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        return df
-    except:
-        return pd.DataFrame()
+        new = fetch_new_rows(st.session_state.last_rowid)
+    except Exception:
+        # Database not created yet, or briefly unavailable
+        st.session_state.pop('conn', None)
+        return False
+    if new.empty:
+        return False
+    
+    window = pd.concat([st.session_state.window, new], ignore_index=True) if not st.session_state.window.empty else new
+    st.session_state.window = window.iloc[-WINDOW_ROWS:].reset_index(drop=True)
+    st.session_state.last_rowid = int(new['rowid'].iloc[-1])
+    return True
+
+def load_rollups(table, seconds):
+    """Rollup rows of the last `seconds`: at most a few hundred rows, whatever the traffic."""
+    df = pd.read_sql_query(
+        f"SELECT * FROM {table} WHERE bucket >= ? ORDER BY bucket",
+        connect(), params=(int(time.time()) - seconds,)
+    )
+    df['time'] = pd.to_datetime(df['bucket'], unit='s')
+    return df
+
+def summarize(rollups):
+    """Totals and merged histograms over a range of rollup rows."""
+    latency_hist = merge_hists(rollups['latency_hist'], len(LATENCY_BOUNDS_MS) + 1)
+    return {
+        'count': int(rollups['count'].sum()),
+        'fraud': int(rollups['fraud_count'].sum()),
+        'latency_mean': rollups['latency_sum_ms'].sum() / max(rollups['count'].sum(), 1),
+        'latency_p99': quantile(latency_hist, 0.99),
+        'prob_hist': merge_hists(rollups['prob_hist'], len(PROB_BINS) - 1),
+    }
+
+def load_view():
+    """Everything the page shows besides the raw window, read from the rollup tables."""
+    minutes = load_rollups('rollup_1m', HISTORY_MINUTES * 60)
+    seconds = load_rollups('rollup_1s', LIVE_SECONDS)
+    history = summarize(minutes)
+    live = summarize(seconds[seconds['bucket'] >= int(time.time()) - LATENCY_SECONDS])
+    return history, live, build_figures(st.session_state.window, history['prob_hist'], minutes, seconds)
+
+def build_figures(df, prob_hist, minutes, seconds):
+    layout = dict(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="#cbd5e1")
+    fig = px.scatter(df, x='timestamp', y='amount', color='is_fraud',
+                     color_discrete_map={1: '#ef4444', 0: '#6366f1'},
+                     size='amount', size_max=15, title="Transaction Stream")
+    fig.update_layout(**layout)
+    
+    # Bar chart of the rolled-up bin counts (no re-binning of raw rows)
+    centers = (PROB_BINS[:-1] + PROB_BINS[1:]) / 2
+    fig2 = go.Figure(go.Bar(x=centers, y=prob_hist, width=PROB_BINS[1] - PROB_BINS[0], marker_color='#8b5cf6'))
+    fig2.update_layout(title=f"Risk Distribution (last {HISTORY_MINUTES // 60}h)", xaxis_title="fraud_prob",
+                       yaxis_title="count", **layout)
+    
+    fig3 = go.Figure([
+        go.Scatter(x=minutes['time'], y=minutes['count'], name="Transactions / min", line_color='#6366f1'),
+        go.Scatter(x=minutes['time'], y=minutes['fraud_count'], name="Frauds / min", line_color='#ef4444', yaxis='y2'),
+    ])
+    fig3.update_layout(title=f"Last {HISTORY_MINUTES // 60} Hours", yaxis2=dict(overlaying='y', side='right'), **layout)
+    
+    fig4 = px.bar(seconds, x='time', y='count', title=f"Throughput (tx/s, last {LIVE_SECONDS // 60} min)",
+                  color_discrete_sequence=['#10b981'])
+    fig4.update_layout(**layout)
+    return fig, fig2, fig3, fig4
 
 # AUTO REFRESH LOGIC
 if 'last_run' not in st.session_state:
@@ -67,42 +166,49 @@ with c2:
     </div>
     """, unsafe_allow_html=True)
 
-# LOAD DATA
-df = load_data()
+# LOAD DATA (only rows newer than the last refresh)
+changed = load_data()
+df = st.session_state.window
 
-if not df.empty:
+# Tiles and charts come from the rollups, rebuilt only when new rows arrived
+if not df.empty and (changed or st.session_state.view is None):
+    try:
+        st.session_state.view = load_view()
+    except Exception:
+        # Rollup tables appear with the first flush of an up-to-date consumer
+        st.session_state.pop('conn', None)
+
+if st.session_state.view is not None:
+    history, live, (fig, fig2, fig3, fig4) = st.session_state.view
     m1, m2, m3, m4 = st.columns(4)
     
-    total = len(df)
-    fraud = df['is_fraud'].sum()
-    rate = (fraud/total)*100
-    avg_lat = df['latency_ms'].mean() if 'latency_ms' in df.columns else 0
+    total = history['count']
+    fraud = history['fraud']
+    rate = (fraud/total)*100 if total else 0
+    p99 = live['latency_p99']
     
-    with m1: st.metric("Buffer Size", f"{total}", "Rows")
-    with m2: st.metric("Fraud Detected", f"{fraud}", f"{rate:.1f}%")
-    with m3: st.metric("Live Latency", f"{avg_lat:.1f}ms")
+    with m1: st.metric("Transactions", f"{total:,}", f"last {HISTORY_MINUTES // 60}h")
+    with m2: st.metric("Fraud Detected", f"{fraud:,}", f"{rate:.1f}%")
+    with m3: st.metric("Live Latency", f"{live['latency_mean']:.1f}ms", f"p99 ≤ {p99:g}ms" if p99 is not None else None)
     with m4: st.metric("Status", "ACTIVE", "Consumer Running")
     
     # CHARTS
-    tab1, tab2 = st.tabs(["🌩️ Live Monitor", "🚨 Fraud List"])
+    tab1, tab2, tab3 = st.tabs(["🌩️ Live Monitor", "📈 History", "🚨 Fraud List"])
     
     with tab1:
         col_chart1, col_chart2 = st.columns([2, 1])
         with col_chart1:
-            fig = px.scatter(df, x='timestamp', y='amount', color='is_fraud',
-                             color_discrete_map={1: '#ef4444', 0: '#6366f1'},
-                             size='amount', size_max=15, title="Transaction Stream")
-            fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="#cbd5e1")
             st.plotly_chart(fig, use_container_width=True)
             
         with col_chart2:
-            fig2 = px.histogram(df, x='fraud_prob', nbins=20, title="Risk Distribution",
-                                color_discrete_sequence=['#8b5cf6'])
-            fig2.update_layout(paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)", font_color="#cbd5e1")
             st.plotly_chart(fig2, use_container_width=True)
-            
+    
     with tab2:
-        st.dataframe(df[df['is_fraud']==1].head(100), use_container_width=True)
+        st.plotly_chart(fig3, use_container_width=True)
+        st.plotly_chart(fig4, use_container_width=True)
+            
+    with tab3:
+        st.dataframe(df[df['is_fraud']==1].iloc[::-1].head(100), use_container_width=True)
 
 else:
     st.info("Waiting for Consumer data... Run `python src/consumer.py`")
@@ -0,0 +1,84 @@
+"""
+Sentinel Stream - Credit-Based Flow Control
+Optional back channel that lets the producer slow down instead of losing data.
+
+With FLOW_CONTROL=credit the consumer acknowledges the highest sequence
+number it has scored over PUSH -> PULL, and the producer keeps at most
+FLOW_CREDIT_WINDOW messages unacknowledged, blocking when the window is
+full instead of letting PUB/SUB drop messages at the high-water mark.
+An idle consumer says so, which releases credits for messages that were
+published before it subscribed and will never arrive.
+"""
+import time
+import zmq
+
+FLOW_MODES = ('none', 'credit')
+
+# Producer binds, consumer (or pool writer) connects
+CREDIT_PORT = 5558
+
+# Consumer sends "idle" after this long without messages
+IDLE_INTERVAL_MS = 1000
+
+
+def window_hwm(hwm, window):
+    """A high-water mark that can hold a full credit window (0 = unlimited stays unlimited)."""
+    return 0 if hwm == 0 else max(hwm, window)
+
+
+class CreditWindow:
+    """Producer side: blocks sends while `window` messages are unacknowledged."""
+
+    def __init__(self, context, window, port=CREDIT_PORT):
+        self.window = max(window, 1)
+        self.acked = -1  # highest sequence number the consumer has scored
+        self.blocked_s = 0.0  # total time spent waiting for credits
+        self.socket = context.socket(zmq.PULL)
+        self.socket.bind(f"tcp://*:{port}")
+
+    def acquire(self, next_seq, n):
+        """Wait until messages next_seq .. next_seq + n - 1 fit in the window."""
+        self._drain(next_seq)
+        if next_seq + n - 1 - self.acked <= self.window:
+            return
+        started = time.monotonic()
+        while next_seq + n - 1 - self.acked > self.window:
+            if self.socket.poll(timeout=IDLE_INTERVAL_MS):
+                self._drain(next_seq)
+        self.blocked_s += time.monotonic() - started
+
+    def _drain(self, next_seq):
+        while True:
+            try:
+                message = self.socket.recv_string(zmq.NOBLOCK)
+            except zmq.Again:
+                return
+            if message == "idle":
+                # Nothing in flight reaches the consumer any more: treat it as settled
+                self.acked = next_seq - 1
+            else:
+                self.acked = max(self.acked, int(message.split(" ", 1)[1]))
+            # Acks from before a producer restart can be ahead of this session
+            self.acked = min(self.acked, next_seq - 1)
+
+
+class CreditSender:
+    """Consumer side: reports progress to the producer, never blocks the consumer."""
+
+    def __init__(self, context, port=CREDIT_PORT):
+        self.socket = context.socket(zmq.PUSH)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.setsockopt(zmq.SNDHWM, 16)
+        self.socket.connect(f"tcp://localhost:{port}")
+
+    def ack(self, seq):
+        self._send(f"ack {seq}")
+
+    def idle(self):
+        self._send("idle")
+
+    def _send(self, message):
+        try:
+            self.socket.send_string(message, zmq.NOBLOCK)
+        except zmq.Again:
+            pass  # producer not there (yet), or a newer ack will follow
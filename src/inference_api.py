@@ -5,19 +5,39 @@ Production-grade REST API for fraud detection inference.
 Designed for Kubernetes deployment with observability.
 """
 
+import hmac
+import io
 import os
+import queue
+import tempfile
 import time
+
+# Process-relative start mark for startup phase timings
+STARTUP_BEGIN = time.perf_counter()
+
+import asyncio
 from typing import Dict, List, Optional
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import FastAPI, HTTPException, status
+import numpy as np
+import orjson
+from fastapi import FastAPI, HTTPException, Header, Request, status
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-import uvicorn
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 
-from src.model.predictor import FraudPredictor
+from src.model.predictor import FraudPredictor, FEATURE_COLUMNS, N_FEATURES, read_model_version
+from src.config import (
+    FRAUD_THRESHOLD, ANOMALY_THRESHOLD, INFERENCE_ENGINE,
+    INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, READY_MAX_QUEUE_DEPTH,
+    MICROBATCH_ENABLED, MICROBATCH_MAX_WAIT_MS, MICROBATCH_MAX_SIZE,
+    SCORE_CHUNK_ROWS, SCORE_MAX_BATCH_BYTES, WARMUP_ROWS, WARMUP_ATTEMPTS, WARMUP_RETRY_S,
+    MODEL_WATCH_INTERVAL, ADMIN_TOKEN
+)
+
+IMPORTS_DONE = time.perf_counter()
 
 
 # Prometheus Metrics
@@ -33,6 +53,16 @@ PREDICTION_LATENCY = Histogram(
     buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
 )
 
+INFERENCE_QUEUE_DEPTH = Gauge(
+    'sentinel_inference_queue_depth',
+    'Inference jobs waiting for an executor worker'
+)
+
+INFERENCE_IN_FLIGHT = Gauge(
+    'sentinel_inference_in_flight',
+    'Inference jobs currently running on an executor worker'
+)
+
 ERROR_COUNTER = Counter(
     'sentinel_errors_total',
     'Total number of errors',
@@ -44,6 +74,57 @@ MODEL_LOADED = Gauge(
     'Whether the model is loaded (1) or not (0)'
 )
 
+MODEL_WARMED_UP = Gauge(
+    'sentinel_model_warmed_up',
+    'Whether the warm-up inference batch has completed (1) or not (0)'
+)
+
+MODEL_INFO = Gauge(
+    'sentinel_model_info',
+    'Artifact version currently serving predictions (value is always 1)',
+    ['version']
+)
+
+MODEL_RELOADS = Counter(
+    'sentinel_model_reloads_total',
+    'Model hot-reload attempts',
+    ['result']  # success/failure
+)
+
+STARTUP_PHASE_SECONDS = Gauge(
+    'sentinel_startup_phase_seconds',
+    'Duration of each startup phase (imports, model_load, warmup, total)',
+    ['phase']
+)
+
+MICROBATCH_SIZE = Histogram(
+    'sentinel_microbatch_size',
+    'Number of /predict requests scored together in one micro-batch',
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128, 256]
+)
+
+MICROBATCH_QUEUE_WAIT = Histogram(
+    'sentinel_microbatch_queue_wait_seconds',
+    'Time a /predict request waited in the micro-batch queue before scoring',
+    buckets=[0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1]
+)
+
+
+# Columnar request columns: model names (Time, V1..V28, Amount) plus the /predict spellings
+COLUMN_INDEX = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+COLUMN_INDEX.update(time=COLUMN_INDEX['Time'], amount=COLUMN_INDEX['Amount'])
+REQUIRED_COLUMNS = (COLUMN_INDEX['Time'], COLUMN_INDEX['Amount'])
+
+# Binary bulk scoring: content types and framing
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+ARROW_EOS = b'\xff\xff\xff\xff\x00\x00\x00\x00'  # end-of-stream: continuation token, empty metadata
+FLOAT32 = np.dtype('<f4')
+FLOAT32_ROW_BYTES = N_FEATURES * FLOAT32.itemsize
+BODY_PIPE_CHUNKS = 8  # request body chunks read ahead of the Arrow reader
+SPOOL_MAX_BYTES = 16 * 1024 * 1024  # scored output held in memory before spilling to a temp file
+RESPONSE_CHUNK_BYTES = 1024 * 1024
+OVERLOAD_RETRY_S = 0.01  # bulk chunks wait for executor capacity instead of failing
+
 
 # Request/Response Models
 class Transaction(BaseModel):
@@ -101,8 +182,10 @@ class PredictionResponse(BaseModel):
     is_fraud: bool
     anomaly_score: float
     is_anomaly: bool
+    fraud_threshold: float
+    anomaly_threshold: float
     latency_ms: float
-    model_version: str = "v1.0"
+    model_version: str
 
 
 class BatchPredictionRequest(BaseModel):
@@ -122,31 +205,633 @@ class HealthResponse(BaseModel):
     """Health check response"""
     status: str
     model_loaded: bool
+    warmed_up: bool
+    model_version: Optional[str] = None
     version: str
 
 
+class ReloadResponse(BaseModel):
+    """Model hot-reload result"""
+    status: str
+    previous_version: str
+    model_version: str
+    reload_seconds: float
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response"""
+    ready: bool
+    model_loaded: bool
+    warmed_up: bool
+    queue_depth: int
+    max_queue_depth: int
+    reason: Optional[str] = None
+
+
+class InferenceOverloaded(Exception):
+    """Raised when the inference queue is full and the request should be shed."""
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for CPU-bound model calls.
+    
+    Keeps XGBoost/IsolationForest work off the event loop so /health and
+    /metrics stay responsive, and rejects new work once max_workers jobs are
+    running and max_queue more are waiting.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0  # queued + running, only touched on the event loop
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.pending - self.max_workers, 0)
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool, or raise InferenceOverloaded if the queue is full."""
+        if self.pending >= self.max_workers + self.max_queue:
+            raise InferenceOverloaded()
+        
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        INFERENCE_QUEUE_DEPTH.inc()
+        future = self._pool.submit(self._call, fn, args)
+        # Counts the job until it finishes or is cancelled before starting,
+        # even if the awaiting request goes away while it is still running
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Cancelled before a worker picked it up: _call never runs to dequeue it
+            if future.cancel():
+                INFERENCE_QUEUE_DEPTH.dec()
+            raise
+
+    def _release(self):
+        self.pending -= 1
+
+    @staticmethod
+    def _call(fn, args):
+        INFERENCE_QUEUE_DEPTH.dec()
+        INFERENCE_IN_FLIGHT.inc()
+        try:
+            return fn(*args)
+        finally:
+            INFERENCE_IN_FLIGHT.dec()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+class MicroBatcher:
+    """
+    Dynamic batcher for /predict.
+    
+    Collects concurrent requests for up to max_wait_ms or max_batch_size,
+    scores them with one vectorized call off the event loop, and resolves
+    each request's future with its own result. Each batch is scored in its
+    own task, so up to INFERENCE_WORKERS batches run at once and the
+    executor's admission control sheds the rest.
+    """
+
+    def __init__(self, max_wait_ms: float, max_batch_size: int, max_queue: int):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_queue = max_queue
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batches = set()  # scoring tasks in flight
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    @property
+    def pending_batches(self) -> int:
+        """Queued requests expressed as the number of batches they will need."""
+        if self.queue is None:
+            return 0
+        return -(-self.queue.qsize() // self.max_batch_size)
+
+    async def submit(self, tx_dict: Dict):
+        """Queue one transaction and wait for (prediction, predictor that scored it)."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((tx_dict, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise InferenceOverloaded()
+        return await future
+
+    async def _collect(self) -> List:
+        """Wait for the first request, then gather peers until full or max_wait expires."""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            
+            scored_at = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                MICROBATCH_QUEUE_WAIT.observe(scored_at - enqueued_at)
+            MICROBATCH_SIZE.observe(len(batch))
+            
+            task = asyncio.create_task(self._score(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _score(self, batch: List):
+        # Pin the predictor for this batch; a hot-reload may swap the global
+        model = predictor
+        try:
+            results = await executor.run(
+                model.predict_batch, [tx for tx, _, _ in batch]
+            )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future, _), result in zip(batch, results):
+            # Client may have disconnected and cancelled its future
+            if not future.done():
+                future.set_result((result, model))
+
+
+def parse_columnar(body: bytes) -> np.ndarray:
+    """
+    Parse a columnar batch straight into an (N, N_FEATURES) float64 matrix:
+    
+        {"columns": ["time", "amount", "V1", ...], "rows": [[...], ...]}
+            any column order; time and amount required, missing V columns are 0
+        [[Time, V1, ..., V28, Amount], ...]  (or the same values flattened)
+            plain array in model feature order
+    
+    Raises ValueError for anything the per-object schema would reject.
+    """
+    payload = orjson.loads(body)
+    if isinstance(payload, dict):
+        columns = payload.get('columns')
+        if (not isinstance(columns, list) or not all(isinstance(name, str) for name in columns)
+                or not isinstance(payload.get('rows'), list)):
+            raise ValueError("expected {\"columns\": [\"name\", ...], \"rows\": [[...], ...]}")
+        index = column_positions(columns)
+        values = as_matrix(payload['rows'], len(columns))
+        X = np.zeros((len(values), N_FEATURES), dtype=np.float64)
+        X[:, index] = values
+    else:
+        X = as_matrix(payload, N_FEATURES)
+    
+    check_values(X)
+    return X
+
+
+def column_positions(columns: List[str]) -> List[int]:
+    """Feature index of each named column; time and amount required, no duplicates."""
+    unknown = [name for name in columns if name not in COLUMN_INDEX]
+    if unknown:
+        raise ValueError(f"unknown columns: {unknown}")
+    index = [COLUMN_INDEX[name] for name in columns]
+    if len(set(index)) != len(index):
+        raise ValueError("duplicate columns")
+    if not all(required in index for required in REQUIRED_COLUMNS):
+        raise ValueError("columns must include time and amount")
+    return index
+
+
+def check_values(X: np.ndarray):
+    """Raise ValueError for values the per-object schema would reject."""
+    if not np.isfinite(X).all():
+        raise ValueError("values must be finite numbers")
+    if (X[:, COLUMN_INDEX['Amount']] < 0).any():
+        raise ValueError("amount must be >= 0")
+
+
+def as_matrix(rows, width: int) -> np.ndarray:
+    """Rows of `width` numbers (or the same values flattened) as a float64 matrix."""
+    if not isinstance(rows, list):
+        raise ValueError("expected a list of rows")
+    try:
+        values = np.array(rows, dtype=np.float64)  # ValueError on ragged rows or strings
+    except TypeError:
+        # Objects (dicts) where numbers should be
+        raise ValueError("rows must contain only numbers") from None
+    if values.ndim == 1 and values.size % width == 0:
+        return values.reshape(-1, width)
+    if values.ndim == 2 and values.shape[1] == width:
+        return values
+    raise ValueError(f"expected rows of {width} values")
+
+
+def orjson_response(content: Dict) -> Response:
+    return Response(orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY), media_type="application/json")
+
+
+class BatchTooLarge(ValueError):
+    """An incoming Arrow message larger than SCORE_MAX_BATCH_BYTES."""
+
+
+class BodyPipe(io.RawIOBase):
+    """
+    Blocking file object over a request body that is still arriving, for a
+    pyarrow stream reader on its own thread. feed() hands body chunks over
+    from the event loop, at most BODY_PIPE_CHUNKS ahead of the reader, so
+    an upload is only read as fast as it is scored.
+    
+    pyarrow reads each message body with a single read(), so read() rejects
+    a record batch above max_read before any of it is buffered.
+    """
+
+    def __init__(self, max_chunks: int = BODY_PIPE_CHUNKS, max_read: int = SCORE_MAX_BATCH_BYTES):
+        self.chunks = queue.SimpleQueue()  # bytes, then None (end) or an exception
+        self.space = asyncio.Semaphore(max_chunks)
+        self.max_read = max_read
+        self.loop = asyncio.get_running_loop()
+        self.current = memoryview(b'')
+        self.ended = False
+
+    async def feed(self, request: Request):
+        try:
+            async for chunk in request.stream():
+                if chunk:
+                    await self.space.acquire()
+                    self.chunks.put(chunk)
+        except asyncio.CancelledError:
+            self.chunks.put(ConnectionError("request cancelled"))
+            raise
+        except Exception as e:
+            # Disconnect: the reader raises it, so a cut-off upload fails instead of ending cleanly
+            self.chunks.put(e)
+            return
+        self.chunks.put(None)
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        """Exactly size bytes, fewer only at the end of the body."""
+        if size is None or size < 0:
+            return self.readall()
+        if size > self.max_read:
+            raise BatchTooLarge(
+                f"Arrow message of {size:,} bytes exceeds SCORE_MAX_BATCH_BYTES ({self.max_read:,}), "
+                "send smaller record batches"
+            )
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        filled = 0
+        while filled < size:
+            n = self.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+        view.release()
+        del buffer[filled:]
+        return bytes(buffer)
+
+    def readinto(self, buffer) -> int:
+        while not self.current:
+            if self.ended:
+                return 0
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.ended = True
+                return 0
+            if isinstance(chunk, Exception):
+                raise chunk
+            self.loop.call_soon_threadsafe(self.space.release)
+            self.current = memoryview(chunk)
+        n = min(len(buffer), len(self.current))
+        buffer[:n] = self.current[:n]
+        self.current = self.current[n:]
+        return n
+
+
+def arrow_positions(schema) -> List[int]:
+    """Feature index of each Arrow column (see column_positions); columns must be numeric."""
+    import pyarrow as pa
+
+    index = column_positions(schema.names)
+    for field in schema:
+        if not (pa.types.is_integer(field.type) or pa.types.is_floating(field.type)):
+            raise ValueError(f"column {field.name} must be numeric, got {field.type}")
+    return index
+
+
+def arrow_matrix(batch, index: List[int]) -> np.ndarray:
+    """(N, N_FEATURES) float64 matrix of an input record batch, missing V columns 0."""
+    X = np.zeros((batch.num_rows, N_FEATURES), dtype=np.float64)
+    for column, i in zip(batch.columns, index):
+        if column.null_count:
+            raise ValueError("values must not be null")
+        X[:, i] = column.to_numpy(zero_copy_only=False)
+    check_values(X)
+    return X
+
+
+def arrow_score_schema(model: FraudPredictor):
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ('fraud_probability', pa.float32()),
+            ('is_fraud', pa.bool_()),
+            ('anomaly_score', pa.float32()),
+            ('is_anomaly', pa.bool_()),
+        ],
+        metadata={
+            'model_version': model.version,
+            'fraud_threshold': str(model.fraud_threshold),
+            'anomaly_threshold': str(model.anomaly_threshold),
+        }
+    )
+
+
+def encode_arrow_scores(scores: Dict, schema) -> bytes:
+    """One scored chunk as an encapsulated Arrow IPC record batch message."""
+    import pyarrow as pa
+
+    batch = pa.record_batch([
+        pa.array(np.asarray(scores['fraud_probability'], dtype=np.float32)),
+        pa.array(np.asarray(scores['is_fraud'], dtype=np.bool_)),
+        pa.array(np.asarray(scores['anomaly_score'], dtype=np.float32)),
+        pa.array(np.asarray(scores['is_anomaly'], dtype=np.bool_)),
+    ], schema=schema)
+    return batch.serialize().to_pybytes()
+
+
+def encode_float32_scores(scores: Dict) -> bytes:
+    """One scored chunk as little-endian float32 (fraud_probability, anomaly_score) pairs."""
+    pairs = np.empty((len(scores['fraud_probability']), 2), dtype=FLOAT32)
+    pairs[:, 0] = scores['fraud_probability']
+    pairs[:, 1] = scores['anomaly_score']
+    return pairs.tobytes()
+
+
+async def arrow_chunks(read_next, index: List[int], chunk_rows: int):
+    """Feature matrices of at most chunk_rows rows, one incoming record batch at a time."""
+    while True:
+        batch = await read_next()
+        if batch is None:
+            return
+        for offset in range(0, batch.num_rows, chunk_rows):
+            yield arrow_matrix(batch.slice(offset, chunk_rows), index)
+
+
+async def float32_chunks(request: Request, chunk_rows: int):
+    """Feature matrices of chunk_rows rows (the last may be shorter) from a raw float32 body."""
+    chunk_bytes = chunk_rows * FLOAT32_ROW_BYTES
+    pending = bytearray()
+    
+    def take(size: int) -> np.ndarray:
+        X = np.frombuffer(bytes(pending[:size]), dtype=FLOAT32).reshape(-1, N_FEATURES)
+        del pending[:size]
+        check_values(X)
+        return X
+    
+    async for data in request.stream():
+        pending += data
+        while len(pending) >= chunk_bytes:
+            yield take(chunk_bytes)
+    if len(pending) % FLOAT32_ROW_BYTES:
+        raise ValueError(f"body is not a whole number of {FLOAT32_ROW_BYTES}-byte rows")
+    if pending:
+        yield take(len(pending))
+
+
+async def score_upload(model: FraudPredictor, chunks, encode, out):
+    """
+    Score feature chunks one model call each, writing the encoded results to
+    out. A full executor makes the chunk wait and retry rather than fail: the
+    upload slows down while interactive requests keep their share of workers.
+    """
+    async for X in chunks:
+        while True:
+            try:
+                scores = await executor.run(model.score_matrix, X)
+                break
+            except InferenceOverloaded:
+                await asyncio.sleep(OVERLOAD_RETRY_S)
+        
+        fraud_count = int(np.count_nonzero(scores['is_fraud']))
+        PREDICTION_COUNTER.labels(result='fraud').inc(fraud_count)
+        PREDICTION_COUNTER.labels(result='legitimate').inc(len(X) - fraud_count)
+        out.write(encode(scores))
+
+
+def spooled_response(spool, media_type: str, model: FraudPredictor) -> StreamingResponse:
+    """Stream the scored results back from the spool (read on Starlette's threadpool)."""
+    def chunks():
+        with spool:
+            spool.seek(0)
+            while data := spool.read(RESPONSE_CHUNK_BYTES):
+                yield data
+    
+    headers = {
+        "Content-Length": str(spool.tell()),
+        "X-Model-Version": model.version,
+        "X-Fraud-Threshold": str(model.fraud_threshold),
+        "X-Anomaly-Threshold": str(model.anomaly_threshold),
+    }
+    return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+
+
 # Global predictor instance
 predictor: Optional[FraudPredictor] = None
+executor: Optional[InferenceExecutor] = None
+batcher: Optional[MicroBatcher] = None
+warmed_up = False
+warmup_failed = False
+reload_lock = asyncio.Lock()
+
+
+def create_predictor() -> FraudPredictor:
+    """Build a FraudPredictor from the deployment configuration."""
+    return FraudPredictor(
+        fraud_threshold=FRAUD_THRESHOLD,
+        anomaly_threshold=ANOMALY_THRESHOLD,
+        engine=INFERENCE_ENGINE
+    )
+
+
+def set_model_info(version: str, previous: Optional[str] = None):
+    """Point the sentinel_model_info metric at the serving version."""
+    if previous is not None and previous != version:
+        with suppress(KeyError):
+            MODEL_INFO.remove(previous)
+    MODEL_INFO.labels(version=version).set(1)
+
+
+async def reload_models(trigger: str) -> ReloadResponse:
+    """
+    Load and warm up a new FraudPredictor in the background, then swap it in.
+    
+    The swap is a single reference assignment; requests that already took a
+    reference to the old predictor finish on it, new requests use the new one.
+    """
+    global predictor
+    async with reload_lock:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        print(f"[INFO] Reloading models ({trigger})...")
+        
+        try:
+            # Default executor: keep reload work out of the inference queue
+            new_predictor = await loop.run_in_executor(None, create_predictor)
+            await loop.run_in_executor(None, new_predictor.warmup, WARMUP_ROWS)
+        except Exception:
+            MODEL_RELOADS.labels(result='failure').inc()
+            raise
+        
+        previous = predictor
+        predictor = new_predictor
+        set_model_info(new_predictor.version, previous.version if previous else None)
+        MODEL_RELOADS.labels(result='success').inc()
+        
+        elapsed = time.perf_counter() - start
+        print(f"[OK] Now serving model {new_predictor.version} (was {previous.version if previous else None}, {elapsed:.2f}s)")
+        return ReloadResponse(
+            status="reloaded",
+            previous_version=previous.version if previous else "none",
+            model_version=new_predictor.version,
+            reload_seconds=elapsed
+        )
+
+
+async def watch_model_version():
+    """Poll the VERSION marker in MODELS_DIR and hot-reload when it changes."""
+    failed_version = None
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        if predictor is None or reload_lock.locked():
+            continue
+        
+        version = read_model_version(predictor.models_dir)
+        # Don't retry a broken artifact until the marker changes again
+        if version is None or version in (predictor.version, failed_version):
+            continue
+        
+        try:
+            await reload_models(trigger=f"VERSION marker changed to {version}")
+            failed_version = None
+        except Exception as e:
+            failed_version = version
+            print(f"[ERROR] Reload of model {version} failed, still serving {predictor.version}: {e}")
+
+
+def record_startup_phase(phase: str, seconds: float):
+    """Log a startup phase duration and export it as a metric."""
+    STARTUP_PHASE_SECONDS.labels(phase=phase).set(seconds)
+    print(f"[INFO] Startup phase '{phase}': {seconds * 1000:.1f}ms")
+
+
+async def warm_up():
+    """
+    Score a synthetic batch on the executor before reporting healthy, so the
+    first real requests don't pay one-time allocation and cache-miss costs.
+    
+    Failures are retried with exponential backoff. After WARMUP_ATTEMPTS the
+    pod would never become ready, so /livez starts failing to get it restarted.
+    """
+    global warmed_up, warmup_failed
+    start = time.perf_counter()
+    delay = WARMUP_RETRY_S
+    for attempt in range(1, WARMUP_ATTEMPTS + 1):
+        try:
+            await executor.run(predictor.warmup, WARMUP_ROWS)
+            break
+        except Exception as e:
+            print(f"[ERROR] Warm-up attempt {attempt}/{WARMUP_ATTEMPTS} failed: {e}")
+        if attempt < WARMUP_ATTEMPTS:
+            await asyncio.sleep(delay)
+            delay *= 2
+    else:
+        print("[ERROR] Warm-up did not succeed, reporting not alive")
+        warmup_failed = True
+        return
+    
+    warmed_up = True
+    MODEL_WARMED_UP.set(1)
+    record_startup_phase('warmup', time.perf_counter() - start)
+    record_startup_phase('total', time.perf_counter() - STARTUP_BEGIN)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load model on startup, cleanup on shutdown"""
-    global predictor
+    """Load model on startup, warm it up in the background, cleanup on shutdown"""
+    global predictor, executor, batcher, warmed_up, warmup_failed
+    record_startup_phase('imports', IMPORTS_DONE - STARTUP_BEGIN)
+    
     try:
         print("[INFO] Loading ML models...")
-        predictor = FraudPredictor()
+        start = time.perf_counter()
+        predictor = create_predictor()
         MODEL_LOADED.set(1)
+        set_model_info(predictor.version)
+        record_startup_phase('model_load', time.perf_counter() - start)
         print("[OK] Models loaded successfully")
     except Exception as e:
         print(f"[ERROR] Failed to load models: {e}")
         MODEL_LOADED.set(0)
         raise
     
+    executor = InferenceExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE)
+    warmup_failed = False
+    warmup_task = asyncio.create_task(warm_up())
+    watch_task = None
+    if MODEL_WATCH_INTERVAL > 0:
+        watch_task = asyncio.create_task(watch_model_version())
+    
+    if MICROBATCH_ENABLED:
+        batcher = MicroBatcher(
+            MICROBATCH_MAX_WAIT_MS, MICROBATCH_MAX_SIZE,
+            max_queue=INFERENCE_QUEUE_SIZE * MICROBATCH_MAX_SIZE
+        )
+        batcher.start()
+        print(f"[INFO] Micro-batching enabled (max_wait={MICROBATCH_MAX_WAIT_MS}ms, max_size={MICROBATCH_MAX_SIZE})")
+    
     yield
     
     # Cleanup
     print("[INFO] Shutting down...")
+    for task in (warmup_task, watch_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    warmed_up = False
+    MODEL_WARMED_UP.set(0)
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+    executor.shutdown()
     MODEL_LOADED.set(0)
 
 
@@ -159,17 +844,83 @@ app = FastAPI(
 )
 
 
+@app.get("/livez", tags=["Health"])
+async def liveness():
+    """
+    Liveness probe: the process and its event loop are responsive.
+    Deliberately ignores model and load state so busy pods are not restarted;
+    the one exception is a warm-up that gave up, which only a restart can fix.
+    """
+    if warmup_failed:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "warmup_failed"}
+        )
+    return {"status": "alive"}
+
+
+def queue_depth() -> int:
+    """Inference jobs waiting for a worker, including pending micro-batches."""
+    depth = executor.queue_depth if executor is not None else 0
+    if batcher is not None:
+        depth += batcher.pending_batches
+    return depth
+
+
+@app.get("/readyz", response_model=ReadinessResponse, tags=["Health"])
+async def readiness():
+    """
+    Readiness probe: models loaded, warm-up complete and the inference queue
+    below READY_MAX_QUEUE_DEPTH. Returns 503 otherwise, so an overloaded pod
+    drops out of the Service instead of piling up latency.
+    """
+    depth = queue_depth()
+    reason = None
+    if predictor is None:
+        reason = "model_not_loaded"
+    elif warmup_failed:
+        reason = "warmup_failed"
+    elif not warmed_up:
+        reason = "warming_up"
+    elif depth >= READY_MAX_QUEUE_DEPTH:
+        reason = "queue_full"
+    
+    readiness = ReadinessResponse(
+        ready=reason is None,
+        model_loaded=predictor is not None,
+        warmed_up=warmed_up,
+        queue_depth=depth,
+        max_queue_depth=READY_MAX_QUEUE_DEPTH,
+        reason=reason
+    )
+    if reason is not None:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=readiness.model_dump()
+        )
+    return readiness
+
+
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """
-    Health check endpoint for Kubernetes probes.
-    Returns model loading status.
+    Combined health check (kept for compatibility; probes use /livez and /readyz).
+    Returns model loading status; 503 until models are loaded and warmed up.
     """
-    return HealthResponse(
-        status="healthy" if predictor is not None else "unhealthy",
+    healthy = predictor is not None and warmed_up
+    health = HealthResponse(
+        status="healthy" if healthy else "unhealthy",
         model_loaded=predictor is not None,
+        warmed_up=warmed_up,
+        model_version=predictor.version if predictor is not None else None,
         version="1.0.0"
     )
+    if not healthy:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=health.model_dump()
+        )
+    return health
 
 
 @app.get("/metrics", tags=["Observability"])
@@ -201,8 +952,13 @@ async def predict(transaction: Transaction):
         # Convert Pydantic model to dict for predictor
         tx_dict = transaction.model_dump()
         
-        # Run inference
-        result = predictor.predict(tx_dict)
+        # Run inference (micro-batched with concurrent requests when enabled).
+        # Keep a reference so a hot-reload mid-request doesn't change the model.
+        if batcher is not None:
+            result, model = await batcher.submit(tx_dict)
+        else:
+            model = predictor
+            result = await executor.run(model.predict, tx_dict)
         
         # Calculate latency
         latency = (time.time() - start_time) * 1000  # ms
@@ -218,9 +974,19 @@ async def predict(transaction: Transaction):
             is_fraud=result['is_fraud'],
             anomaly_score=result['anomaly_score'],
             is_anomaly=result['is_anomaly'],
-            latency_ms=latency
+            fraud_threshold=model.fraud_threshold,
+            anomaly_threshold=model.anomaly_threshold,
+            latency_ms=latency,
+            model_version=model.version
         )
         
+    except InferenceOverloaded:
+        ERROR_COUNTER.labels(type='overloaded').inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference queue full, retry later",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         ERROR_COUNTER.labels(type='prediction_error').inc()
         raise HTTPException(
@@ -243,36 +1009,35 @@ async def batch_predict(request: BatchPredictionRequest):
         )
     
     start_time = time.time()
-    predictions = []
-    fraud_count = 0
     
     try:
-        for tx in request.transactions:
-            tx_start = time.time()
-            tx_dict = tx.model_dump()
-            result = predictor.predict(tx_dict)
-            tx_latency = (time.time() - tx_start) * 1000
-            
-            pred = PredictionResponse(
+        # Score the whole batch in one vectorized call
+        tx_dicts = [tx.model_dump() for tx in request.transactions]
+        model = predictor
+        results = await executor.run(model.predict_batch, tx_dicts)
+        
+        total_latency = (time.time() - start_time) * 1000
+        avg_latency = total_latency / len(results) if results else 0.0
+        
+        predictions = [
+            PredictionResponse(
                 fraud_probability=result['fraud_probability'],
                 is_fraud=result['is_fraud'],
                 anomaly_score=result['anomaly_score'],
                 is_anomaly=result['is_anomaly'],
-                latency_ms=tx_latency
+                fraud_threshold=model.fraud_threshold,
+                anomaly_threshold=model.anomaly_threshold,
+                latency_ms=avg_latency,
+                model_version=model.version
             )
-            predictions.append(pred)
-            
-            if result['is_fraud']:
-                fraud_count += 1
-            
-            # Update metrics
-            PREDICTION_COUNTER.labels(
-                result='fraud' if result['is_fraud'] else 'legitimate'
-            ).inc()
+            for result in results
+        ]
         
-        total_latency = (time.time() - start_time) * 1000
-        avg_latency = total_latency / len(request.transactions)
+        fraud_count = sum(1 for result in results if result['is_fraud'])
         
+        # Update metrics
+        PREDICTION_COUNTER.labels(result='fraud').inc(fraud_count)
+        PREDICTION_COUNTER.labels(result='legitimate').inc(len(results) - fraud_count)
         PREDICTION_LATENCY.observe(time.time() - start_time)
         
         return BatchPredictionResponse(
@@ -282,6 +1047,93 @@ async def batch_predict(request: BatchPredictionRequest):
             avg_latency_ms=avg_latency
         )
         
+    except InferenceOverloaded:
+        ERROR_COUNTER.labels(type='overloaded').inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference queue full, retry later",
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        ERROR_COUNTER.labels(type='batch_prediction_error').inc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch prediction failed: {str(e)}"
+        )
+
+
+@app.post(
+    "/batch_predict/columnar",
+    tags=["Inference"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"example": {
+                "columns": ["time", "amount", "V1", "V2"],
+                "rows": [[12345.0, 150.5, -1.36, -0.07], [12346.0, 12.0, 1.19, 0.27]]
+            }}}
+        }
+    }
+)
+async def batch_predict_columnar(request: Request):
+    """
+    Columnar batch prediction for large batches.
+    
+    Parses the body directly into a NumPy matrix (no per-transaction models)
+    and returns parallel arrays, serialized with orjson. Same scores as
+    /batch_predict, row i of the request -> element i of each array.
+    """
+    if predictor is None:
+        ERROR_COUNTER.labels(type='model_not_loaded').inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model not loaded"
+        )
+    
+    start_time = time.time()
+    
+    try:
+        X = parse_columnar(await request.body())
+    except (ValueError, TypeError, orjson.JSONDecodeError) as e:
+        ERROR_COUNTER.labels(type='invalid_request').inc()
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    
+    try:
+        model = predictor
+        if len(X):
+            scores = await executor.run(model.score_matrix, X)
+        else:
+            scores = dict.fromkeys(('fraud_probability', 'is_fraud', 'anomaly_score', 'is_anomaly'), [])
+        
+        fraud_count = int(np.count_nonzero(scores['is_fraud']))
+        total_latency = (time.time() - start_time) * 1000
+        
+        # Update metrics
+        PREDICTION_COUNTER.labels(result='fraud').inc(fraud_count)
+        PREDICTION_COUNTER.labels(result='legitimate').inc(len(X) - fraud_count)
+        PREDICTION_LATENCY.observe(time.time() - start_time)
+        
+        # orjson writes the NumPy arrays directly, no per-element Python objects
+        return orjson_response({
+            "fraud_probability": scores['fraud_probability'],
+            "is_fraud": scores['is_fraud'],
+            "anomaly_score": scores['anomaly_score'],
+            "is_anomaly": scores['is_anomaly'],
+            "fraud_threshold": model.fraud_threshold,
+            "anomaly_threshold": model.anomaly_threshold,
+            "model_version": model.version,
+            "total_processed": len(X),
+            "total_fraud": fraud_count,
+            "latency_ms": total_latency
+        })
+        
+    except InferenceOverloaded:
+        ERROR_COUNTER.labels(type='overloaded').inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference queue full, retry later",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         ERROR_COUNTER.labels(type='batch_prediction_error').inc()
         raise HTTPException(
@@ -290,6 +1142,169 @@ async def batch_predict(request: BatchPredictionRequest):
         )
 
 
+@app.post(
+    "/score/arrow",
+    tags=["Inference"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {ARROW_STREAM_TYPE: {"schema": {"type": "string", "format": "binary"}}}
+        }
+    }
+)
+async def score_arrow(request: Request):
+    """
+    Bulk scoring over Arrow IPC streams.
+    
+    The body is an Arrow IPC stream with Time, V1..V28, Amount columns of any
+    numeric type (time / amount spellings accepted, missing V columns are 0).
+    It is scored SCORE_CHUNK_ROWS rows at a time while it uploads, and the
+    response is an Arrow IPC stream with one record batch per chunk,
+    row-aligned with the input: fraud_probability, is_fraud, anomaly_score,
+    is_anomaly. Memory holds one incoming record batch at a time: batches
+    above SCORE_MAX_BATCH_BYTES are rejected with 413 before they are read,
+    so write large tables with a max_chunksize.
+    """
+    if predictor is None:
+        ERROR_COUNTER.labels(type='model_not_loaded').inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model not loaded"
+        )
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="pyarrow is not installed")
+    
+    model = predictor
+    pipe = BodyPipe()
+    feeder = asyncio.create_task(pipe.feed(request))
+    # One thread per upload: the reader blocks while the body is in flight
+    reader_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='arrow-reader')
+    loop = asyncio.get_running_loop()
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    
+    def open_reader():
+        try:
+            return pa.ipc.open_stream(pipe)
+        except OSError as e:
+            raise ValueError(f"unreadable Arrow stream: {e}")
+    
+    def next_batch():
+        try:
+            return reader.read_next_batch()
+        except StopIteration:
+            return None
+        except OSError as e:  # body ended inside a message
+            raise ValueError(f"truncated Arrow stream: {e}")
+    
+    async def read_next():
+        return await loop.run_in_executor(reader_thread, next_batch)
+    
+    try:
+        reader = await loop.run_in_executor(reader_thread, open_reader)
+        index = arrow_positions(reader.schema)
+        schema = arrow_score_schema(model)
+        spool.write(schema.serialize().to_pybytes())
+        await score_upload(
+            model, arrow_chunks(read_next, index, SCORE_CHUNK_ROWS),
+            lambda scores: encode_arrow_scores(scores, schema), spool
+        )
+        spool.write(ARROW_EOS)
+    except BatchTooLarge as e:
+        spool.close()
+        ERROR_COUNTER.labels(type='invalid_request').inc()
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:  # includes pyarrow.ArrowInvalid
+        spool.close()
+        ERROR_COUNTER.labels(type='invalid_request').inc()
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        spool.close()
+        ERROR_COUNTER.labels(type='batch_prediction_error').inc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Bulk scoring failed: {str(e)}"
+        )
+    finally:
+        feeder.cancel()  # wakes a reader still waiting for body chunks
+        reader_thread.shutdown(wait=False)
+    
+    return spooled_response(spool, ARROW_STREAM_TYPE, model)
+
+
+@app.post(
+    "/score/float32",
+    tags=["Inference"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}}
+        }
+    }
+)
+async def score_float32(request: Request):
+    """
+    Bulk scoring over raw float32 matrices.
+    
+    The body is little-endian float32 rows of 30 values in model feature
+    order (Time, V1..V28, Amount), e.g. X.astype('<f4').tobytes(). It is
+    scored SCORE_CHUNK_ROWS rows at a time while it uploads; the response is
+    little-endian float32 (fraud_probability, anomaly_score) pairs, one per
+    input row. Thresholds and model version are in the response headers.
+    """
+    if predictor is None:
+        ERROR_COUNTER.labels(type='model_not_loaded').inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Model not loaded"
+        )
+    
+    model = predictor
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        await score_upload(model, float32_chunks(request, SCORE_CHUNK_ROWS), encode_float32_scores, spool)
+    except ValueError as e:
+        spool.close()
+        ERROR_COUNTER.labels(type='invalid_request').inc()
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        spool.close()
+        ERROR_COUNTER.labels(type='batch_prediction_error').inc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Bulk scoring failed: {str(e)}"
+        )
+    
+    return spooled_response(spool, "application/octet-stream", model)
+
+
+@app.post("/admin/reload", response_model=ReloadResponse, tags=["Admin"])
+async def admin_reload(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Hot-reload models from MODELS_DIR without dropping traffic.
+    
+    The new predictor is loaded and warmed up in the background; the current
+    one keeps serving until the swap. Returns 409 if a reload is in progress.
+    Disabled (404) unless ADMIN_TOKEN is set.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+    if reload_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Reload already in progress")
+    
+    try:
+        return await reload_models(trigger="admin endpoint")
+    except Exception as e:
+        ERROR_COUNTER.labels(type='reload_error').inc()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Reload failed, still serving {predictor.version}: {str(e)}"
+        )
+
+
 @app.get("/", tags=["Info"])
 async def root():
     """API information"""
@@ -299,15 +1314,23 @@ async def root():
         "description": "Production ML inference service",
         "endpoints": {
             "health": "/health",
+            "livez": "/livez",
+            "readyz": "/readyz",
             "metrics": "/metrics",
             "predict": "/predict",
             "batch_predict": "/batch_predict",
+            "batch_predict_columnar": "/batch_predict/columnar",
+            "score_arrow": "/score/arrow",
+            "score_float32": "/score/float32",
+            "reload": "/admin/reload",
             "docs": "/docs"
         }
     }
 
 
 if __name__ == "__main__":
+    import uvicorn
+    
     uvicorn.run(
         "src.inference_api:app",
         host="0.0.0.0",
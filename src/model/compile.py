@@ -0,0 +1,381 @@
+"""
+Compile trained tree ensembles into flat array-of-nodes form.
+
+Both the XGBoost booster and the Isolation Forest are flattened into the
+same layout (feature index, threshold, children, leaf value) so they can be
+scored with vectorized NumPy traversal instead of the sklearn/xgboost
+Python APIs. See `evaluate_trees` in predictor.py for the evaluator.
+
+The compiled models can be saved as flat .npy arrays plus a JSON manifest
+(models/compiled/). Loading them with np.load(mmap_mode='r') lets every
+uvicorn worker share one page-cache copy instead of unpickling its own.
+
+Run from project root: python -m src.model.compile
+"""
+import os
+import sys
+import json
+import numpy as np
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODELS_DIR = os.getenv('MODELS_DIR', os.path.join(BASE_DIR, 'models'))
+COMPILED_DIR = os.path.join(MODELS_DIR, 'compiled')
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+class TreeEnsemble:
+    """
+    Tree ensemble stored as concatenated node arrays.
+
+    Every split uses the rule `x <= threshold` -> left. Leaves have
+    feature == -1 and point to themselves, so traversal can run a fixed
+    number of steps (max_depth) for every tree at once.
+    """
+
+    ARRAYS = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots')
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, max_depth):
+        self.feature = feature            # int32, -1 for leaves
+        self.threshold = threshold        # float64
+        self.left = left                  # int32, global node index
+        self.right = right                # int32, global node index
+        self.default_left = default_left  # bool, direction for NaN inputs
+        self.value = value                # float64, leaf contribution
+        self.roots = roots                # int32, root node of each tree
+        self.max_depth = int(max_depth)
+
+        # Traversal tables derived once per load instead of per evaluate_trees call:
+        # children[2 * node + go_right] is the next node, leaves read feature 0 harmlessly
+        self.children = np.stack([left, right], axis=1).ravel()
+        self.split_feature = np.maximum(feature, 0)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_trees(cls, trees):
+        """
+        Build an ensemble from per-tree node lists.
+
+        Args:
+            trees: iterable of (feature, threshold, left, right, default_left, value)
+                arrays with tree-local child indices and -1 children for leaves.
+        """
+        parts = {name: [] for name in cls.ARRAYS if name != 'roots'}
+        roots = []
+        offset = 0
+        max_depth = 0
+
+        for feature, threshold, left, right, default_left, value in trees:
+            n = len(feature)
+            is_leaf = left < 0
+            node_ids = np.arange(n)
+
+            parts['feature'].append(np.where(is_leaf, -1, feature))
+            parts['threshold'].append(np.where(is_leaf, 0.0, threshold))
+            parts['left'].append(np.where(is_leaf, node_ids, left) + offset)
+            parts['right'].append(np.where(is_leaf, node_ids, right) + offset)
+            parts['default_left'].append(default_left)
+            parts['value'].append(np.where(is_leaf, value, 0.0))
+
+            roots.append(offset)
+            max_depth = max(max_depth, int(_node_depths(left, right).max()))
+            offset += n
+
+        return cls(
+            feature=np.concatenate(parts['feature']).astype(np.int32),
+            threshold=np.concatenate(parts['threshold']).astype(np.float64),
+            left=np.concatenate(parts['left']).astype(np.int32),
+            right=np.concatenate(parts['right']).astype(np.int32),
+            default_left=np.concatenate(parts['default_left']).astype(bool),
+            value=np.concatenate(parts['value']).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth
+        )
+
+
+class CompiledModels:
+    """Compiled XGBoost and Isolation Forest plus the scalars needed to finish scoring."""
+
+    def __init__(self, xgb, iso, xgb_base_margin, iso_denominator, iso_offset,
+                 scale_mean, scale_std):
+        self.xgb = xgb
+        self.iso = iso
+        self.scale_mean = scale_mean  # StandardScaler.mean_
+        self.scale_std = scale_std    # StandardScaler.scale_
+        self.xgb_base_margin = float(xgb_base_margin)  # added to the summed leaf values
+        self.iso_denominator = float(iso_denominator)  # n_trees * c(max_samples)
+        self.iso_offset = float(iso_offset)            # IsolationForest.offset_
+
+
+def _node_depths(left, right):
+    """Depth of every node (root = 0) from tree-local child arrays."""
+    depths = np.zeros(len(left), dtype=np.int64)
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        if left[node] >= 0:
+            depths[left[node]] = depths[right[node]] = depths[node] + 1
+            stack.extend((left[node], right[node]))
+    return depths
+
+
+def _average_path_length(n_samples):
+    """Average path length of an unsuccessful BST search (Isolation Forest c(n))."""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    mask = n_samples > 2
+    n = n_samples[mask]
+    result[mask] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+
+def compile_xgboost(xgb_model):
+    """
+    Flatten a binary:logistic XGBClassifier.
+
+    Returns:
+        (TreeEnsemble, base_margin)
+    """
+    booster = xgb_model.get_booster()
+    model = json.loads(booster.save_raw('json'))['learner']
+
+    objective = model['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Unsupported XGBoost objective: {objective}")
+
+    trees = model['gradient_booster']['model']['trees']
+    try:
+        trees = trees[:xgb_model.best_iteration + 1]
+    except AttributeError:
+        pass  # No early stopping: predict() uses every tree
+
+    def flatten(tree):
+        if any(tree['split_type']):
+            raise ValueError("Categorical splits are not supported")
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        right = np.asarray(tree['right_children'], dtype=np.int64)
+        # XGBoost splits on x < t in float32; x <= nextafter(t, -inf) is the same test
+        split = np.asarray(tree['split_conditions'], dtype=np.float32)
+        threshold = np.nextafter(split, np.float32(-np.inf))
+        return (
+            np.asarray(tree['split_indices'], dtype=np.int64),
+            threshold.astype(np.float64),
+            left,
+            right,
+            np.asarray(tree['default_left'], dtype=bool),
+            split.astype(np.float64)  # leaves store their weight in split_conditions
+        )
+
+    # base_score is stored as a string like "[5E-1]"
+    base_score = float(model['learner_model_param']['base_score'].strip('[]'))
+    base_margin = np.log(base_score / (1.0 - base_score))
+
+    return TreeEnsemble.from_trees(flatten(tree) for tree in trees), base_margin
+
+
+def compile_isolation_forest(iso_model):
+    """
+    Flatten a fitted IsolationForest.
+
+    Leaf values hold depth + c(n_node_samples), so summing leaves across trees
+    gives the total path length used by score_samples.
+
+    Returns:
+        (TreeEnsemble, denominator, offset)
+    """
+    # Features are only subsampled when max_features < n_features
+    subsample_features = iso_model._max_features != iso_model.n_features_in_
+
+    def flatten(estimator, features):
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        feature = tree.feature.astype(np.int64)
+        if subsample_features:
+            feature = np.where(left >= 0, np.asarray(features)[np.maximum(feature, 0)], -1)
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count))
+        value = _node_depths(left, right) + _average_path_length(tree.n_node_samples)
+        return (
+            feature,
+            tree.threshold,
+            left,
+            right,
+            np.asarray(missing_left) != 0,
+            value
+        )
+
+    ensemble = TreeEnsemble.from_trees(
+        flatten(estimator, features)
+        for estimator, features in zip(iso_model.estimators_, iso_model.estimators_features_)
+    )
+    denominator = ensemble.n_trees * _average_path_length([iso_model._max_samples])[0]
+    return ensemble, denominator, iso_model.offset_
+
+
+def compile_models(xgb_model, iso_model, scaler):
+    """Compile both trained models and the scaler statistics into a CompiledModels bundle."""
+    xgb, base_margin = compile_xgboost(xgb_model)
+    iso, denominator, offset = compile_isolation_forest(iso_model)
+
+    n = scaler.n_features_in_
+    scale_mean = scaler.mean_ if scaler.with_mean else np.zeros(n)
+    scale_std = scaler.scale_ if scaler.with_std else np.ones(n)
+
+    return CompiledModels(
+        xgb, iso, base_margin, denominator, offset,
+        np.asarray(scale_mean, dtype=np.float64), np.asarray(scale_std, dtype=np.float64)
+    )
+
+
+def save_compiled(compiled, out_dir=COMPILED_DIR, model_version=None):
+    """
+    Write CompiledModels as one .npy file per array plus manifest.json.
+
+    The manifest is written last, so a directory without one is incomplete.
+    model_version is the VERSION marker of the pickles the arrays were
+    compiled from; has_compiled uses it to spot a stale artifact.
+    Files are replaced rather than rewritten in place: running processes that
+    memory-mapped the previous files keep reading the old inodes.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    def save(name, array):
+        path = os.path.join(out_dir, f'{name}.npy')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    save('scale_mean', compiled.scale_mean)
+    save('scale_std', compiled.scale_std)
+    for prefix, ensemble in (('xgb', compiled.xgb), ('iso', compiled.iso)):
+        for name in TreeEnsemble.ARRAYS:
+            save(f'{prefix}_{name}', getattr(ensemble, name))
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_version': model_version,
+        'n_features': int(len(compiled.scale_mean)),
+        'xgb': {'max_depth': compiled.xgb.max_depth, 'base_margin': compiled.xgb_base_margin},
+        'iso': {
+            'max_depth': compiled.iso.max_depth,
+            'denominator': compiled.iso_denominator,
+            'offset': compiled.iso_offset
+        }
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    with open(f'{manifest_path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+
+
+def has_compiled(models_dir=COMPILED_DIR, model_version=None):
+    """
+    Whether a complete compiled artifact exists in models_dir.
+
+    With model_version set, an artifact compiled from other pickles (an older
+    VERSION, or no recorded version) counts as missing.
+    """
+    try:
+        with open(os.path.join(models_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return False
+    return model_version is None or manifest.get('model_version') == model_version
+
+
+def load_compiled(models_dir=COMPILED_DIR, mmap_mode='r'):
+    """
+    Load CompiledModels saved by save_compiled.
+
+    With mmap_mode='r' the arrays are read-only memory maps backed by the
+    page cache, shared by every process that maps the same files.
+    """
+    with open(os.path.join(models_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest['format_version'] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled model format: {manifest['format_version']}")
+
+    def load(name):
+        return np.load(os.path.join(models_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+
+    def load_ensemble(prefix):
+        arrays = {name: load(f'{prefix}_{name}') for name in TreeEnsemble.ARRAYS}
+        return TreeEnsemble(max_depth=manifest[prefix]['max_depth'], **arrays)
+
+    return CompiledModels(
+        xgb=load_ensemble('xgb'),
+        iso=load_ensemble('iso'),
+        xgb_base_margin=manifest['xgb']['base_margin'],
+        iso_denominator=manifest['iso']['denominator'],
+        iso_offset=manifest['iso']['offset'],
+        scale_mean=load('scale_mean'),
+        scale_std=load('scale_std')
+    )
+
+
+def verify_compiled(compiled, xgb_model, iso_model, X_scaled, atol=1e-5):
+    """
+    Check compiled scores against the original models.
+
+    Args:
+        X_scaled: Scaled (N, 30) feature matrix
+        atol: Max allowed absolute difference for probability and anomaly score
+
+    Returns:
+        dict with max differences and flag mismatch counts
+    """
+    from src.model.predictor import score_compiled
+
+    prob, score = score_compiled(compiled, X_scaled)
+    ref_prob = xgb_model.predict_proba(X_scaled)[:, 1]
+    ref_score = iso_model.decision_function(X_scaled)
+
+    report = {
+        'rows': len(X_scaled),
+        'max_prob_diff': float(np.max(np.abs(prob - ref_prob))),
+        'max_score_diff': float(np.max(np.abs(score - ref_score))),
+        'fraud_mismatches': int(np.sum((prob > 0.5) != (ref_prob > 0.5))),
+        'anomaly_mismatches': int(np.sum((score < 0) != (ref_score < 0)))
+    }
+    if report['max_prob_diff'] > atol or report['max_score_diff'] > atol:
+        raise ValueError(f"Compiled models do not match originals: {report}")
+    return report
+
+
+def main():
+    import joblib
+    from src.model.predictor import read_model_version
+
+    print(f"[INFO] Compiling models from: {MODELS_DIR}")
+    xgb_model = joblib.load(os.path.join(MODELS_DIR, 'xgboost_model.pkl'))
+    iso_model = joblib.load(os.path.join(MODELS_DIR, 'isolation_forest.pkl'))
+    scaler = joblib.load(os.path.join(MODELS_DIR, 'scaler.pkl'))
+
+    compiled = compile_models(xgb_model, iso_model, scaler)
+    print(f"   XGBoost: {compiled.xgb.n_trees} trees, {compiled.xgb.n_nodes} nodes, depth {compiled.xgb.max_depth}")
+    print(f"   Isolation Forest: {compiled.iso.n_trees} trees, {compiled.iso.n_nodes} nodes, depth {compiled.iso.max_depth}")
+
+    # Scaled features are roughly standard normal; widen the spread to reach rare leaves
+    rng = np.random.default_rng(42)
+    X = rng.normal(0, 3, size=(20000, xgb_model.n_features_in_))
+    report = verify_compiled(compiled, xgb_model, iso_model, X)
+    print(f"[OK] Compiled models match originals: {report}")
+
+    save_compiled(compiled, model_version=read_model_version(MODELS_DIR))
+    print(f"[OK] Compiled models saved to: {COMPILED_DIR}")
+
+
+if __name__ == "__main__":
+    sys.path.append(BASE_DIR)
+    main()
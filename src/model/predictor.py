@@ -1,62 +1,176 @@
 
 import os
-import joblib
-import pandas as pd
+import threading
 import numpy as np
 
+from src.model.compile import compile_models, has_compiled, load_compiled
+
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-MODELS_DIR = os.path.join(BASE_DIR, 'models')
+MODELS_DIR = os.getenv('MODELS_DIR', os.path.join(BASE_DIR, 'models'))
+
+# Version marker, written last by the trainer once every artifact is in place
+VERSION_FILE = 'VERSION'
+
+# Feature order must match training data: Time, V1-V28, Amount
+FEATURE_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+N_FEATURES = len(FEATURE_COLUMNS)
+
+# Rows scored per traversal step in evaluate_trees, bounds the (rows, trees) index arrays
+NATIVE_CHUNK_ROWS = 4096
+
+
+def evaluate_trees(ensemble, X):
+    """
+    Sum leaf values of every tree in a compiled TreeEnsemble for each row of X.
+    
+    All trees are walked together with vectorized NumPy indexing, one level
+    per step; leaves point to themselves so max_depth steps reach every leaf.
+    """
+    # Models split on float32 features, same as sklearn/xgboost input validation
+    X = np.asarray(X, dtype=np.float32)
+    n_rows, n_cols = X.shape
+    totals = np.empty(n_rows, dtype=np.float64)
+    children = ensemble.children
+    feature = ensemble.split_feature
+    
+    for start in range(0, n_rows, NATIVE_CHUNK_ROWS):
+        X_chunk = np.ascontiguousarray(X[start:start + NATIVE_CHUNK_ROWS])
+        flat = X_chunk.ravel()
+        row_offsets = (np.arange(X_chunk.shape[0], dtype=np.int64) * n_cols)[:, None]
+        has_nan = np.isnan(flat).any()
+        nodes = np.broadcast_to(ensemble.roots, (X_chunk.shape[0], ensemble.n_trees)).copy()
+        
+        for _ in range(ensemble.max_depth):
+            x = flat[row_offsets + feature[nodes]]
+            go_right = ~(x <= ensemble.threshold[nodes])
+            if has_nan:
+                go_right &= ~(np.isnan(x) & ensemble.default_left[nodes])
+            nodes = children[2 * nodes + go_right]
+        
+        totals[start:start + NATIVE_CHUNK_ROWS] = ensemble.value[nodes].sum(axis=1)
+    return totals
+
+
+def score_compiled(compiled, X_scaled):
+    """
+    Score a scaled feature matrix with CompiledModels.
+    
+    Returns:
+        (fraud_probability, anomaly_score) arrays matching XGBClassifier.predict_proba[:, 1]
+        and IsolationForest.decision_function
+    """
+    margin = evaluate_trees(compiled.xgb, X_scaled) + compiled.xgb_base_margin
+    xgb_prob = 1.0 / (1.0 + np.exp(-margin))
+    
+    path_length = evaluate_trees(compiled.iso, X_scaled)
+    iso_score = -np.power(2.0, -path_length / compiled.iso_denominator) - compiled.iso_offset
+    return xgb_prob, iso_score
+
+
+def read_model_version(models_dir=MODELS_DIR):
+    """Artifact version from the VERSION marker in models_dir, or None if absent."""
+    try:
+        with open(os.path.join(models_dir, VERSION_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
 
 
 class FraudPredictor:
-    def __init__(self):
+    ENGINES = ('sklearn', 'native')
+
+    def __init__(self, fraud_threshold=0.5, anomaly_threshold=0.0, engine='sklearn',
+                 models_dir=MODELS_DIR):
+        # is_fraud: probability > fraud_threshold (0.5 matches XGBClassifier.predict)
+        # is_anomaly: score < anomaly_threshold (0.0 matches IsolationForest.predict)
+        self.fraud_threshold = fraud_threshold
+        self.anomaly_threshold = anomaly_threshold
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown inference engine '{engine}', expected one of {self.ENGINES}")
+        # 'native' scores with compiled node arrays instead of the sklearn/xgboost APIs
+        self.engine = engine
+        self.models_dir = models_dir
+        self.compiled_dir = os.path.join(models_dir, 'compiled')
+        # Read before loading: if artifacts change mid-load, a watcher sees a newer marker
+        self.marker = read_model_version(models_dir)
+        self.version = self.marker or os.getenv('MODEL_VERSION', 'unknown')
+        self.compiled = None
         self.xgb_model = None
         self.iso_model = None
         self.scaler = None
+        self.scale_mean = None
+        self.scale_std = None
+        self._local = threading.local()
         self.load_models()
 
     def load_models(self):
-        """Load trained models from disk."""
+        """
+        Load trained models from disk.
+        
+        The native engine memory-maps the compiled .npy artifact when present
+        and compiled from the current VERSION, so uvicorn workers share one
+        page-cache copy; otherwise the pickles are loaded with joblib (and
+        compiled in memory for the native engine).
+        """
         try:
-            print(f"[INFO] Loading models from: {MODELS_DIR}")
-            self.xgb_model = joblib.load(os.path.join(MODELS_DIR, 'xgboost_model.pkl'))
-            self.iso_model = joblib.load(os.path.join(MODELS_DIR, 'isolation_forest.pkl'))
-            self.scaler = joblib.load(os.path.join(MODELS_DIR, 'scaler.pkl'))
-            print("[OK] Models loaded successfully")
+            if self.engine == 'native' and has_compiled(self.compiled_dir, self.marker):
+                print(f"[INFO] Memory-mapping compiled models from: {self.compiled_dir}")
+                self.compiled = load_compiled(self.compiled_dir, mmap_mode='r')
+                self.scale_mean = self.compiled.scale_mean
+                self.scale_std = self.compiled.scale_std
+            else:
+                # Unpickling pulls in sklearn/xgboost, so only import joblib when needed
+                import joblib
+                
+                print(f"[INFO] Loading models from: {self.models_dir}")
+                self.xgb_model = joblib.load(os.path.join(self.models_dir, 'xgboost_model.pkl'))
+                self.iso_model = joblib.load(os.path.join(self.models_dir, 'isolation_forest.pkl'))
+                self.scaler = joblib.load(os.path.join(self.models_dir, 'scaler.pkl'))
+                self._precompute_scaling()
+                if self.engine == 'native':
+                    if has_compiled(self.compiled_dir):
+                        print(f"[INFO] Compiled models in {self.compiled_dir} are not from version "
+                              f"{self.marker}, compiling in memory")
+                    self.compiled = compile_models(self.xgb_model, self.iso_model, self.scaler)
+            print(f"[OK] Models loaded successfully (engine: {self.engine}, version: {self.version})")
         except FileNotFoundError as e:
             print(f"[ERROR] Error loading models: {e}")
             raise
 
+    def _precompute_scaling(self):
+        """Cache StandardScaler statistics so scaling is plain (x - mean_) / scale_."""
+        n = self.scaler.n_features_in_
+        self.scale_mean = self.scaler.mean_ if self.scaler.with_mean else np.zeros(n)
+        self.scale_std = self.scaler.scale_ if self.scaler.with_std else np.ones(n)
+
+    @staticmethod
+    def _fill_row(transaction, row):
+        """Write transaction fields into a feature row in FEATURE_COLUMNS order."""
+        # Normalize keys (producer sends lowercase, model trained on TitleCase)
+        row[0] = transaction.get('time', transaction.get('Time', 0))
+        for i in range(1, 29):
+            row[i] = transaction.get(f'V{i}', 0)
+        row[29] = transaction.get('amount', transaction.get('Amount', 0))
+
     def preprocess(self, transaction):
         """
         Preprocess a single transaction dictionary for inference.
         Expected keys: V1-V28, Amount, Time
-        """
-        # Normalize keys (producer sends lowercase, model trained on TitleCase)
-        # Create a new dict with correct casing
-        normalized_tx = {
-            'Time': float(transaction.get('time', transaction.get('Time', 0))),
-            'Amount': float(transaction.get('amount', transaction.get('Amount', 0)))
-        }
-        
-        # Add V1-V28
-        for i in range(1, 29):
-            col = f'V{i}'
-            normalized_tx[col] = float(transaction.get(col, 0))
-            
-        # Create DataFrame with single row
-        df = pd.DataFrame([normalized_tx])
         
-        # Ensure correct column order (must match training data: Time, V1-V28, Amount)
-        features = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+        Writes into a reused per-thread (1, 30) buffer, so the returned array
+        is only valid until the next preprocess() call on the same thread.
+        """
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.empty((1, N_FEATURES), dtype=np.float64)
         
-        # Select only feature columns
-        df_features = df[features]
+        self._fill_row(transaction, row[0])
         
-        # Scale features
-        X_scaled = self.scaler.transform(df_features)
-        return X_scaled
+        # Scale features in place
+        np.subtract(row, self.scale_mean, out=row)
+        np.divide(row, self.scale_std, out=row)
+        return row
 
     def predict(self, transaction):
         """
@@ -71,20 +185,91 @@ class FraudPredictor:
             }
         """
         X = self.preprocess(transaction)
+        scores = self._evaluate(X)
         
-        # XGBoost Prediction (Supervised)
-        xgb_prob = self.xgb_model.predict_proba(X)[0][1]
-        xgb_pred = int(self.xgb_model.predict(X)[0])
-        
-        # Isolation Forest Prediction (Unsupervised)
-        # predict returns -1 for outlier, 1 for inlier
-        iso_raw = self.iso_model.predict(X)[0]
-        iso_pred = 1 if iso_raw == -1 else 0
-        iso_score = self.iso_model.decision_function(X)[0] 
+        return {
+            'fraud_probability': float(scores['fraud_probability'][0]),
+            'is_fraud': bool(scores['is_fraud'][0]),
+            'anomaly_score': float(scores['anomaly_score'][0]),
+            'is_anomaly': bool(scores['is_anomaly'][0])
+        }
+
+    def _evaluate(self, X_scaled):
+        """
+        Evaluate each model exactly once and derive both flags from the scores.
+        """
+        if self.compiled is not None:
+            xgb_prob, iso_score = score_compiled(self.compiled, X_scaled)
+        else:
+            # XGBoost Prediction (Supervised)
+            xgb_prob = self.xgb_model.predict_proba(X_scaled)[:, 1].astype(np.float64)
+            
+            # Isolation Forest Prediction (Unsupervised)
+            iso_score = self.iso_model.decision_function(X_scaled).astype(np.float64)
         
         return {
-            'fraud_probability': float(xgb_prob),
-            'is_fraud': bool(xgb_pred),
-            'anomaly_score': float(iso_score),
-            'is_anomaly': bool(iso_pred)
+            'fraud_probability': xgb_prob,
+            'is_fraud': xgb_prob > self.fraud_threshold,
+            'anomaly_score': iso_score,
+            'is_anomaly': iso_score < self.anomaly_threshold  # < 0 is IsolationForest.predict's outlier
         }
+
+    def to_matrix(self, transactions):
+        """
+        Build a raw (N, 30) float64 feature matrix from transaction dictionaries.
+        Columns follow FEATURE_COLUMNS (Time, V1-V28, Amount); float64 like
+        preprocess(), so a transaction scores the same alone or in a batch.
+        """
+        X = np.empty((len(transactions), N_FEATURES), dtype=np.float64)
+        for row, tx in zip(X, transactions):
+            self._fill_row(tx, row)
+        return X
+
+    def score_matrix(self, X):
+        """
+        Run inference on a raw (N, 30) feature matrix in a single pass per model.
+        
+        Returns:
+            dict of arrays, each of length N: {
+                'fraud_probability', 'is_fraud', 'anomaly_score', 'is_anomaly'
+            }
+        """
+        X_scaled = (X - self.scale_mean) / self.scale_std
+        return self._evaluate(X_scaled)
+
+    def predict_batch(self, transactions):
+        """
+        Run vectorized inference on a list of transaction dictionaries.
+        
+        Returns:
+            list of dicts with the same keys as predict(), in input order.
+        """
+        if not transactions:
+            return []
+        
+        scores = self.score_matrix(self.to_matrix(transactions))
+        return [
+            {
+                'fraud_probability': float(prob),
+                'is_fraud': bool(fraud),
+                'anomaly_score': float(score),
+                'is_anomaly': bool(anomaly)
+            }
+            for prob, fraud, score, anomaly in zip(
+                scores['fraud_probability'], scores['is_fraud'],
+                scores['anomaly_score'], scores['is_anomaly']
+            )
+        ]
+
+    def warmup(self, n_rows=256):
+        """
+        Score synthetic transactions once through both the single-row and batch
+        paths so later calls don't pay first-use allocation and cache-miss costs.
+        """
+        rng = np.random.default_rng(0)
+        X = self.scale_mean + rng.standard_normal((max(n_rows, 1), N_FEATURES)) * self.scale_std
+        X = X.astype(np.float32)
+        
+        self.predict(dict(zip(FEATURE_COLUMNS, X[0].tolist())))
+        if n_rows > 1:
+            self.score_matrix(X)
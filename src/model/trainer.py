@@ -1,6 +1,8 @@
 
 import os
+import sys
 import joblib
+from datetime import datetime, timezone
 import numpy as np
 from sklearn.ensemble import IsolationForest
 from sklearn.metrics import classification_report, confusion_matrix, precision_recall_curve, auc
@@ -12,6 +14,11 @@ from loader import load_data, preprocess_data
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 MODELS_DIR = os.path.join(BASE_DIR, 'models')
 
+# Fix Import Path for 'src' module
+sys.path.append(BASE_DIR)
+
+from src.model.compile import COMPILED_DIR, compile_models, save_compiled, verify_compiled
+
 
 def train_isolation_forest(X_train, y_train, X_test, y_test):
     """
@@ -125,6 +132,44 @@ def save_models(isolation_forest_model, xgboost_model, scaler):
     print(f"   ✅ scaler.pkl")
 
 
+def build_compiled_models(isolation_forest_model, xgboost_model, scaler, X_test, version=None):
+    """Compile both ensembles to node arrays, check them against the originals and save."""
+    print(f"\n⚙️  Compiling models for the native inference engine...")
+    
+    compiled = compile_models(xgboost_model, isolation_forest_model, scaler)
+    report = verify_compiled(compiled, xgboost_model, isolation_forest_model, X_test)
+    
+    print(f"   XGBoost: {compiled.xgb.n_trees} trees, {compiled.xgb.n_nodes} nodes")
+    print(f"   Isolation Forest: {compiled.iso.n_trees} trees, {compiled.iso.n_nodes} nodes")
+    print(f"   ✅ Matches originals on {report['rows']:,} test rows "
+          f"(max prob diff {report['max_prob_diff']:.2e}, max score diff {report['max_score_diff']:.2e})")
+    
+    save_compiled(compiled, COMPILED_DIR, model_version=version)
+    print(f"   ✅ compiled/ (memory-mappable .npy arrays)")
+    
+    return compiled
+
+
+def new_model_version():
+    """Version string for a training run, e.g. v20250101-120000."""
+    return datetime.now(timezone.utc).strftime('v%Y%m%d-%H%M%S')
+
+
+def write_model_version(version=None):
+    """
+    Write the models/VERSION marker. Called last, so a running inference API
+    watching the marker only reloads once every artifact is in place.
+    """
+    version = version or new_model_version()
+    path = os.path.join(MODELS_DIR, 'VERSION')
+    with open(f'{path}.tmp', 'w') as f:
+        f.write(version + '\n')
+    os.replace(f'{path}.tmp', path)
+    
+    print(f"   ✅ VERSION ({version})")
+    return version
+
+
 def main():
     """Main training pipeline."""
     print("╔" + "="*58 + "╗")
@@ -142,6 +187,14 @@ def main():
     # Save models
     save_models(iso_model, xgb_model, scaler)
     
+    # Compile for native inference (verified against the trained models),
+    # stamped with the version published below so stale arrays are never mapped
+    version = new_model_version()
+    build_compiled_models(iso_model, xgb_model, scaler, X_test, version)
+    
+    # Publish the new version last (running APIs hot-reload on this marker)
+    write_model_version(version)
+    
     print("\n" + "="*60)
     print("✅ Training Complete!")
     print("="*60)
@@ -1,10 +1,14 @@
 """
 Sentinel Stream - Transaction Producer (ZeroMQ Version)
-Generates synthetic transaction data and sends to ZeroMQ (No Docker required).
+Generates synthetic transaction data and sends to ZeroMQ (No Docker required),
+or to Kafka / Redpanda with TRANSPORT=kafka.
+
+Usage: python src/producer.py [--rate 50000] [--batch 500] [--replay [CSV]] [--count N] [--seed S]
 """
-import json
 import time
-import random
+import argparse
+import numpy as np
+import pandas as pd
 import zmq
 import sys
 import os
@@ -12,55 +16,203 @@ import os
 # Fix Import Path
 sys.path.append(os.getcwd())
 
-from src.config import TRANSACTIONS_TOPIC
+from src.config import (
+    TRANSACTIONS_TOPIC, WIRE_FORMAT, WIRE_DTYPE, RATE_LIMIT, BATCH_SIZE, CSV_PATH,
+    ZMQ_SNDHWM, FLOW_CONTROL, FLOW_CREDIT_WINDOW, TRANSPORT
+)
+from src.flow import FLOW_MODES, CreditWindow, window_hwm
+from src.transport import TRANSPORTS, KafkaSink, create_kafka_producer
+from src.wire import WIRE_FORMATS, WIRE_FIELDS, N_FEATURES, encode_binary_block, encode_json
 
 # ZeroMQ Config
 ZMQ_PORT = 5555
 
-def create_producer():
-    context = zmq.Context()
-    socket = context.socket(zmq.PUB)
+# Synthetic rows generated per NumPy call
+GENERATE_BLOCK = 8192
+
+# CSV columns in WIRE_FIELDS order (Kaggle creditcard.csv naming)
+CSV_COLUMNS = ['Time'] + [f'V{i}' for i in range(1, 29)] + ['Amount']
+
+def create_producer(context=None, hwm=ZMQ_SNDHWM, wait_for_subscriber=False):
+    """
+    PUB socket on ZMQ_PORT. With wait_for_subscriber it is an XPUB that returns
+    only once a consumer has subscribed, so nothing is published into the void.
+    """
+    context = context or zmq.Context()
+    socket = context.socket(zmq.XPUB if wait_for_subscriber else zmq.PUB)
+    socket.setsockopt(zmq.SNDHWM, hwm)  # must be set before bind
     socket.bind(f"tcp://*:{ZMQ_PORT}")
-    print(f"✅ Bound to ZeroMQ port {ZMQ_PORT}")
+    print(f"✅ Bound to ZeroMQ port {ZMQ_PORT} (HWM {hwm or 'unlimited'})")
+    if wait_for_subscriber:
+        print("⏳ Waiting for a consumer to subscribe...")
+        socket.recv()  # first subscription message
     return socket
 
-def generate_transaction():
-    """Generate fake transaction data"""
-    is_fraud = random.random() < 0.1
+def generate_block(n, rng):
+    """
+    Synthetic transactions as an (n, N_FEATURES) float64 matrix in WIRE_FIELDS
+    order: 10% fraud (night hours, amounts 1000-5000, V features with std 3),
+    the rest daytime with amounts 10-500 and standard-normal V features.
+    """
+    is_fraud = rng.random(n) < 0.1
+    X = np.empty((n, N_FEATURES))
+    hour = np.where(is_fraud, rng.choice([0, 1, 2, 3, 23], n), rng.integers(8, 22, n))
+    X[:, 0] = hour * 3600 + rng.integers(0, 3601, n)
+    X[:, 1:29] = rng.standard_normal((n, 28)) * np.where(is_fraud, 3.0, 1.0)[:, None]
+    X[:, 29] = np.where(is_fraud, rng.uniform(1000, 5000, n), rng.uniform(10, 500, n)).round(2)
+    return X
+
+def load_replay(csv_path=CSV_PATH):
+    """Rows of a creditcard.csv-style file as a float64 matrix in WIRE_FIELDS order."""
+    print(f"📂 Loading replay data from {csv_path}...")
+    return pd.read_csv(csv_path, usecols=CSV_COLUMNS)[CSV_COLUMNS].to_numpy(dtype=np.float64)
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: refills at `rate` tokens/s up to `capacity`,
+    acquire(n) sleeps until n tokens are available. rate <= 0 disables it.
     
-    if is_fraud:
-        amount = random.uniform(1000, 5000)
-        hour = random.choice([0, 1, 2, 3, 23])
+    Tokens left over from a late wake-up carry into the next acquire (up to
+    capacity), so sleep overshoot doesn't lower the long-run rate.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def acquire(self, n=1):
+        if self.rate <= 0:
+            return
+        n = min(n, self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return
+            time.sleep((n - self.tokens) / self.rate)
+
+def burst_size(rate, batch_size):
+    """Messages per burst: BATCH_SIZE, but at least one burst every ~100 ms at low rates."""
+    if rate <= 0:
+        return max(batch_size, 1)
+    return max(1, min(batch_size, int(rate // 10)))
+
+def send_block(producer, X, seq_start, wire_format=WIRE_FORMAT, dtype=WIRE_DTYPE):
+    """Publish every row of X back to back, all stamped with the same send time."""
+    sent_ns = time.monotonic_ns()
+    if wire_format == "binary":
+        messages = encode_binary_block(TRANSACTIONS_TOPIC, X, seq_start, sent_ns, 8 if dtype == "float64" else 4)
     else:
-        amount = random.uniform(10, 500)
-        hour = random.choice(range(8, 22))
-        
-    tx = {
-        "time": hour * 3600 + random.randint(0, 3600),
-        "amount": round(amount, 2)
-    }
+        messages = [
+            encode_json(TRANSACTIONS_TOPIC, dict(zip(WIRE_FIELDS, row)), seq_start + i, sent_ns)
+            for i, row in enumerate(X.tolist())
+        ]
+    # Frame-by-frame send() is ~3x cheaper than send_multipart() for small messages
+    send, more = producer.send, zmq.SNDMORE
+    for *head, last in messages:
+        for frame in head:
+            send(frame, more)
+        send(last)
+
+def produce_loop(rate=RATE_LIMIT, batch_size=BATCH_SIZE, replay=None, count=None, seed=None, kafka_producer=None):
+    """
+    Send transactions in bursts of up to batch_size, paced by a token bucket
+    at `rate` tx/s (0 = as fast as possible). Synthetic rows come from
+    generate_block(); with replay set, rows of that CSV are streamed once
+    in file order. Stops after `count` messages if given.
+    
+    TRANSPORT=kafka publishes to TRANSACTIONS_TOPIC instead, through
+    kafka_producer if given (any object with send/flush/close).
+    """
+    if WIRE_FORMAT not in WIRE_FORMATS:
+        raise ValueError(f"Unknown WIRE_FORMAT '{WIRE_FORMAT}', expected one of {WIRE_FORMATS}")
+    if FLOW_CONTROL not in FLOW_MODES:
+        raise ValueError(f"Unknown FLOW_CONTROL '{FLOW_CONTROL}', expected one of {FLOW_MODES}")
+    if TRANSPORT not in TRANSPORTS:
+        raise ValueError(f"Unknown TRANSPORT '{TRANSPORT}', expected one of {TRANSPORTS}")
+    
+    rng = np.random.default_rng(seed)
+    data = load_replay(replay) if replay else None
+    burst = burst_size(rate, batch_size)
+    limiter = TokenBucket(rate, 2 * burst)
     
-    # V1-V28 features
-    for i in range(1, 29):
-        tx[f"V{i}"] = random.gauss(0, 3 if is_fraud else 1)
+    context = zmq.Context()
+    credits = None
+    if TRANSPORT == "kafka":
+        # The broker stores everything, no credits needed; the client batches per partition
+        sink = KafkaSink(kafka_producer or create_kafka_producer())
+        publish = sink.send_block
+        print(f"✅ Publishing to Kafka topic '{TRANSACTIONS_TOPIC}'")
+    else:
+        if FLOW_CONTROL == "credit":
+            # The PUB queue must hold a whole window, otherwise it still drops
+            burst = min(burst, FLOW_CREDIT_WINDOW)
+            credits = CreditWindow(context, FLOW_CREDIT_WINDOW)
+            producer = create_producer(context, window_hwm(ZMQ_SNDHWM, FLOW_CREDIT_WINDOW), wait_for_subscriber=True)
+            print(f"🎟️  Credit flow control: at most {FLOW_CREDIT_WINDOW} unacknowledged messages")
+        else:
+            producer = create_producer(context)
         
-    return tx
-
-def produce_loop(speed=0.01): # Fast 100 tx/sec
-    producer = create_producer()
-    print(f"🚀 Producer started! emitting events...")
+        def publish(rows, seq_start):
+            if credits is not None:
+                credits.acquire(seq_start, len(rows))
+            send_block(producer, rows, seq_start)
+    source = f"replay of {len(data)} rows" if data is not None else "synthetic"
+    print(f"🚀 Producer started! emitting events ({WIRE_FORMAT}, {source}, "
+          f"{rate if rate > 0 else 'unlimited'} tx/s, bursts of {burst})...")
     
+    sent = 0
+    block, offset = np.empty((0, N_FEATURES)), 0
+    started = last_report = time.monotonic()
     try:
-        count = 0
-        while True:
-            tx = generate_transaction()
-            producer.send_string(f"{TRANSACTIONS_TOPIC} {json.dumps(tx)}")
-            count += 1
-            if count % 100 == 0:
-                print(f"Sent {count} transactions...", end='\r')
-            time.sleep(speed)
+        while count is None or sent < count:
+            n = burst if count is None else min(burst, count - sent)
+            
+            if data is not None:
+                if sent >= len(data):
+                    break
+                rows = data[sent:sent + n]
+            else:
+                if offset >= len(block):
+                    block, offset = generate_block(GENERATE_BLOCK, rng), 0
+                rows = block[offset:offset + n]
+                offset += len(rows)
+            
+            limiter.acquire(len(rows))
+            publish(rows, sent)
+            sent += len(rows)
+            
+            now = time.monotonic()
+            if now - last_report >= 1:
+                print(f"Sent {sent} transactions ({sent / (now - started):,.0f} tx/s)...", end='\r')
+                last_report = now
     except KeyboardInterrupt:
         print("\n🛑 Producer stopped")
+    finally:
+        # Deliver what is still queued: Kafka client buffers, then every ZeroMQ socket
+        if TRANSPORT == "kafka":
+            sink.close()
+        context.destroy()
+    
+    elapsed = time.monotonic() - started
+    print(f"\n✅ Sent {sent} transactions in {elapsed:.1f}s ({sent / max(elapsed, 1e-9):,.0f} tx/s)")
+    if credits is not None:
+        print(f"🎟️  Waited {credits.blocked_s:.1f}s for consumer credits")
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish transactions to ZeroMQ or Kafka")
+    parser.add_argument('--rate', type=int, default=RATE_LIMIT, help="tx/s, 0 = unlimited (default: RATE_LIMIT)")
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help="max messages per burst (default: BATCH_SIZE)")
+    parser.add_argument('--replay', nargs='?', const=CSV_PATH, default=None,
+                        help="stream rows from a CSV instead of synthetic data (default file: CSV_PATH)")
+    parser.add_argument('--count', type=int, default=None, help="stop after N messages")
+    parser.add_argument('--seed', type=int, default=None, help="seed for reproducible synthetic data")
+    args = parser.parse_args()
+    
+    produce_loop(rate=args.rate, batch_size=args.batch, replay=args.replay, count=args.count, seed=args.seed)
 
 if __name__ == "__main__":
-    produce_loop()
+    main()
@@ -0,0 +1,301 @@
+"""
+Sentinel Stream - Retention
+Keeps sentinel.db bounded: a background thread with its own connection
+deletes transactions (and per-second rollups) older than RETENTION_HOURS,
+per-minute rollups older than RETENTION_ROLLUP_DAYS, and hands the freed
+pages back to the filesystem with incremental vacuum.
+
+Deletes run in chunks of RETENTION_CHUNK_ROWS rows, one short transaction
+each, so the consumer's batched inserts wait milliseconds at most (its
+busy_timeout covers it). Rowids grow with insert time, so an expired range
+is found once through the timestamp index and then deleted by rowid.
+
+With RETENTION_EXPORT=parquet, expired transactions are first written to
+RETENTION_EXPORT_DIR/hour=YYYY-MM-DDTHH/transactions-<first>-<last>.parquet
+and only deleted once their file is complete. A file stays open across
+passes until its hour has fully expired (or RETENTION_EXPORT_FILE_ROWS),
+so there is one file per hour rather than one per pass. A crash before
+a file completes can export the same rows again on restart, never lose
+them.
+
+Retention is off by default (RETENTION_HOURS=0). A database created
+before it was turned on is not in incremental auto-vacuum mode; deleted
+pages are still reused, but the file only shrinks after a one-time
+offline conversion:
+
+    python -m src.retention --convert sentinel.db
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.config import (
+    RETENTION_HOURS, RETENTION_ROLLUP_DAYS, RETENTION_INTERVAL_S, RETENTION_CHUNK_ROWS,
+    RETENTION_EXPORT, RETENTION_EXPORT_DIR, RETENTION_EXPORT_FILE_ROWS, ARCHIVE_COMPRESSION
+)
+
+EXPORT_FORMATS = ('none', 'parquet')
+
+EXPORT_COLUMNS = [
+    "rowid", "timestamp", "amount", "fraud_prob", "is_fraud", "latency_ms",
+    "seq", "queue_ms", "parse_ms", "inference_ms", "db_write_ms",
+]
+
+# Pages returned to the OS per incremental_vacuum transaction
+VACUUM_PAGES = 2000
+
+
+def enable_incremental_vacuum(conn):
+    """
+    Request auto_vacuum=INCREMENTAL, which only takes effect on a database
+    with no tables yet (call before journal_mode=WAL). Returns whether the
+    database is in that mode; changing an existing one takes a full VACUUM,
+    left to convert_to_incremental_vacuum() so startup never blocks on it.
+    """
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def convert_to_incremental_vacuum(db_path):
+    """One-time full VACUUM into incremental mode; run with the consumer stopped."""
+    conn = sqlite3.connect(db_path)
+    try:
+        if enable_incremental_vacuum(conn):
+            print(f"🧹 {db_path} already uses incremental auto-vacuum")
+            return
+        print(f"🧹 Converting {db_path} to incremental auto-vacuum (full VACUUM)...")
+        started = time.monotonic()
+        conn.execute("VACUUM")
+        print(f"✅ Converted in {time.monotonic() - started:.1f}s")
+    finally:
+        conn.close()
+
+
+def start_retention(db_path):
+    """Start the retention thread for db_path, or return None when RETENTION_HOURS=0."""
+    if RETENTION_EXPORT not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown RETENTION_EXPORT '{RETENTION_EXPORT}', expected one of {EXPORT_FORMATS}")
+    if RETENTION_HOURS <= 0:
+        return None
+    worker = RetentionWorker(db_path)
+    worker.start()
+    print(f"🧹 Retention: keeping {RETENTION_HOURS:g}h of transactions, {RETENTION_ROLLUP_DAYS:g}d of per-minute rollups")
+    return worker
+
+
+def stop_retention(worker):
+    if worker is not None:
+        worker.stop()
+
+
+class RetentionWorker(threading.Thread):
+    """Runs a retention pass every RETENTION_INTERVAL_S on its own connection."""
+
+    def __init__(self, db_path, hours=RETENTION_HOURS, rollup_days=RETENTION_ROLLUP_DAYS,
+                 interval_s=RETENTION_INTERVAL_S, chunk_rows=RETENTION_CHUNK_ROWS, export=RETENTION_EXPORT):
+        super().__init__(name="retention", daemon=True)
+        self.db_path = db_path
+        self.window = timedelta(hours=hours)
+        self.rollup_window = timedelta(days=rollup_days)
+        self.interval_s = interval_s
+        self.chunk_rows = max(chunk_rows, 1)
+        self.export = export
+        self.exporter = ParquetExporter(RETENTION_EXPORT_DIR) if export == "parquet" else None
+        self.exported_through = None  # last rowid written to the exporter
+        self.stopping = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA busy_timeout=5000")
+        try:
+            while not self.stopping.is_set():
+                try:
+                    self.run_pass(conn)
+                except sqlite3.Error as e:
+                    # Busy past the timeout or similar: the next pass picks it up
+                    print(f"⚠️  Retention pass failed: {e}")
+                self.stopping.wait(self.interval_s)
+        finally:
+            if self.exporter is not None:
+                # Complete the open file, so its rows are not exported again on restart
+                self.exporter.close()
+                try:
+                    self.delete_through(conn, self.exporter.completed_through, interruptible=False)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Retention pass failed: {e}")
+            conn.close()
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+
+    def run_pass(self, conn):
+        now = datetime.now(timezone.utc)
+        started = time.monotonic()
+        deleted = self.expire_transactions(conn, now - self.window)
+        with conn:
+            conn.execute("DELETE FROM rollup_1s WHERE bucket < ?", (int((now - self.window).timestamp()),))
+            conn.execute("DELETE FROM rollup_1m WHERE bucket < ?", (int((now - self.rollup_window).timestamp()),))
+        freed = self.vacuum(conn)
+        # Keep the WAL from growing between automatic checkpoints
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        if deleted:
+            print(f"🧹 Expired {deleted:,} transactions, freed {freed:,} pages in {time.monotonic() - started:.1f}s")
+
+    def expire_transactions(self, conn, cutoff):
+        end = conn.execute(
+            # CURRENT_TIMESTAMP format, UTC
+            "SELECT max(rowid) FROM transactions WHERE timestamp < ?", (cutoff.strftime('%Y-%m-%d %H:%M:%S'),)
+        ).fetchone()[0]
+        if end is None:
+            return 0
+        if self.exporter is not None:
+            start = conn.execute("SELECT min(rowid) FROM transactions").fetchone()[0]
+            if self.exported_through is not None:
+                start = max(start, self.exported_through + 1)
+            self.export_range(conn, start, end)
+            if self.exporter.hour is not None and self.exporter.hour < cutoff.strftime('%Y-%m-%dT%H'):
+                self.exporter.close()  # the open file's hour has fully expired
+            # Rows in the still-open file stay until it is complete
+            end = min(end, self.exporter.completed_through or 0)
+        return self.delete_through(conn, end)
+
+    def delete_through(self, conn, end, interruptible=True):
+        """Delete transactions with rowid <= end in chunk_rows transactions (until stop(), if interruptible)."""
+        start = conn.execute("SELECT min(rowid) FROM transactions").fetchone()[0]
+        if start is None or not end:
+            return 0
+        deleted = 0
+        for lo in range(start, end + 1, self.chunk_rows):
+            if interruptible and self.stopping.is_set():
+                break
+            with conn:
+                deleted += conn.execute(
+                    "DELETE FROM transactions WHERE rowid >= ? AND rowid < ?",
+                    (lo, min(lo + self.chunk_rows, end + 1))
+                ).rowcount
+        return deleted
+
+    def export_range(self, conn, start, end):
+        """Append rowids start..end to the hour-partitioned Parquet files, read chunk_rows at a time."""
+        lo = start
+        while lo <= end:
+            rows = conn.execute(
+                f"SELECT {', '.join(EXPORT_COLUMNS)} FROM transactions "
+                "WHERE rowid >= ? AND rowid <= ? ORDER BY rowid LIMIT ?",
+                (lo, end, self.chunk_rows)
+            ).fetchall()
+            if not rows:
+                break
+            self.exporter.write(rows)
+            self.exported_through = lo = rows[-1][0]
+            lo += 1
+
+    def vacuum(self, conn):
+        """Free pages in VACUUM_PAGES steps; returns how many went back to the filesystem."""
+        before = free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free and not self.stopping.is_set():
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free:
+                break  # auto_vacuum is not INCREMENTAL on this database
+            free = remaining
+        return before - free
+
+
+class ParquetExporter:
+    """
+    Appends expired rows (EXPORT_COLUMNS tuples in rowid order) to one
+    Parquet file per hour, started anew every RETENTION_EXPORT_FILE_ROWS
+    rows. Files are written under a hidden name and renamed when complete;
+    completed_through is the last rowid in a complete file.
+    """
+
+    def __init__(self, directory, compression=ARCHIVE_COMPRESSION, file_rows=RETENTION_EXPORT_FILE_ROWS):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.directory = directory
+        self.compression = compression
+        self.file_rows = max(file_rows, 1)
+        self.schema = pa.schema([
+            ('rowid', pa.int64()),
+            ('timestamp', pa.timestamp('s', tz='UTC')),
+            ('amount', pa.float64()),
+            ('fraud_prob', pa.float64()),
+            ('is_fraud', pa.bool_()),
+            ('latency_ms', pa.float64()),
+            ('seq', pa.int64()),
+            ('queue_ms', pa.float64()),
+            ('parse_ms', pa.float64()),
+            ('inference_ms', pa.float64()),
+            ('db_write_ms', pa.float64()),
+        ])
+        self.writer = None
+        self.hour = None
+        self.completed_through = None
+
+    def write(self, rows):
+        # Split the chunk where the hour changes ("YYYY-MM-DD HH" prefix of timestamp)
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i][1][:13] != rows[start][1][:13]:
+                self._write_hour(rows[start:i])
+                start = i
+
+    def close(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        final = os.path.join(os.path.dirname(self.path), f"transactions-{self.first_rowid}-{self.last_rowid}.parquet")
+        os.replace(self.path, final)
+        self.writer = None
+        self.hour = None
+        self.completed_through = self.last_rowid
+
+    def _write_hour(self, rows):
+        hour = rows[0][1][:13].replace(' ', 'T')
+        if self.writer is not None and (hour != self.hour or self.written >= self.file_rows):
+            self.close()
+        if self.writer is None:
+            self._open(hour, rows[0][0])
+        self.writer.write_table(self._to_table(rows))
+        self.written += len(rows)
+        self.last_rowid = rows[-1][0]
+
+    def _open(self, hour, first_rowid):
+        import pyarrow.parquet as pq
+
+        partition = os.path.join(self.directory, f"hour={hour}")
+        os.makedirs(partition, exist_ok=True)
+        self.path = os.path.join(partition, f".transactions-{first_rowid}.parquet.inprogress")
+        self.writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+        self.hour = hour
+        self.first_rowid = first_rowid
+        self.written = 0
+
+    def _to_table(self, rows):
+        pa = self.pa
+        columns = list(zip(*rows))
+        arrays = []
+        for field, values in zip(self.schema, columns):
+            if field.name == 'timestamp':
+                # CURRENT_TIMESTAMP text is UTC without an offset
+                arrays.append(pa.array(values, pa.string()).cast(pa.timestamp('s')).cast(field.type))
+            elif field.name == 'is_fraud':
+                arrays.append(pa.array(values, pa.int8()).cast(field.type))
+            else:
+                arrays.append(pa.array(values, field.type))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "--convert":
+        convert_to_incremental_vacuum(sys.argv[2] if len(sys.argv) == 3 else "sentinel.db")
+    else:
+        print("Usage: python -m src.retention --convert [sentinel.db]")
+        sys.exit(2)
@@ -0,0 +1,103 @@
+"""
+Sentinel Stream - Rollups
+Per-second and per-minute aggregates of scored transactions, written by the
+consumer in the same transaction as the row inserts, so the dashboard can
+chart hours of history from a few hundred small rows.
+
+Each rollup row holds count, fraud_count, latency_sum_ms and two histograms
+stored as little-endian int64 BLOBs:
+    latency_hist  log-spaced latency buckets (LATENCY_BOUNDS_MS), a mergeable
+                  quantile sketch: quantiles come back to within one bucket
+    prob_hist     fraud-probability bins (PROB_BINS)
+Histograms merge by element-wise addition (hist_add() in SQL).
+"""
+import time
+import numpy as np
+
+# Table -> bucket width in seconds; bucket = unix time rounded down to the width
+ROLLUP_TABLES = {'rollup_1s': 1, 'rollup_1m': 60}
+
+# Upper bounds in ms (1, 1.5, 2, 3, 5, 7 per decade, 10 us .. 100 s) plus an overflow bucket
+LATENCY_BOUNDS_MS = np.array([m * 10.0 ** e for e in range(-2, 5) for m in (1, 1.5, 2, 3, 5, 7)] + [1e5])
+PROB_BINS = np.linspace(0, 1, 21)
+
+HIST_DTYPE = np.dtype('<i8')
+
+
+def create_tables(cursor):
+    for table in ROLLUP_TABLES:
+        cursor.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                           (bucket INTEGER PRIMARY KEY,
+                            count INTEGER,
+                            fraud_count INTEGER,
+                            latency_sum_ms REAL,
+                            latency_hist BLOB,
+                            prob_hist BLOB)''')
+
+
+def register(conn):
+    """Make hist_add() available to the upserts on this connection."""
+    conn.create_function("hist_add", 2, hist_add, deterministic=True)
+
+
+def hist_add(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (decode_hist(a) + decode_hist(b)).tobytes()
+
+
+def decode_hist(blob):
+    return np.frombuffer(blob, dtype=HIST_DTYPE)
+
+
+def update_rollups(conn, rows, now=None):
+    """
+    Add a flush's INSERT rows (amount, fraud_prob, is_fraud, latency_ms, ...)
+    to every rollup table. Call inside the transaction that inserts them:
+    the rows get CURRENT_TIMESTAMP of that moment, so one bucket per table.
+    """
+    if not rows:
+        return
+    now = int(time.time() if now is None else now)
+    values = np.array([row[1:4] for row in rows], dtype=np.float64)
+    fraud_prob, is_fraud, latency_ms = values[:, 0], values[:, 1], values[:, 2]
+    latency_ms = latency_ms[~np.isnan(latency_ms)]
+
+    latency_hist = np.bincount(
+        np.searchsorted(LATENCY_BOUNDS_MS, latency_ms), minlength=len(LATENCY_BOUNDS_MS) + 1
+    ).astype(HIST_DTYPE)
+    prob_hist = np.histogram(fraud_prob, PROB_BINS)[0].astype(HIST_DTYPE)
+    aggregate = (len(rows), int(is_fraud.sum()), float(latency_ms.sum()), latency_hist.tobytes(), prob_hist.tobytes())
+
+    for table, width in ROLLUP_TABLES.items():
+        conn.execute(
+            f'''INSERT INTO {table} (bucket, count, fraud_count, latency_sum_ms, latency_hist, prob_hist)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(bucket) DO UPDATE SET
+                    count = count + excluded.count,
+                    fraud_count = fraud_count + excluded.fraud_count,
+                    latency_sum_ms = latency_sum_ms + excluded.latency_sum_ms,
+                    latency_hist = hist_add(latency_hist, excluded.latency_hist),
+                    prob_hist = hist_add(prob_hist, excluded.prob_hist)''',
+            (now - now % width, *aggregate)
+        )
+
+
+def merge_hists(blobs, size):
+    """Sum of a column of histogram BLOBs (None for an empty range)."""
+    total = np.zeros(size, dtype=HIST_DTYPE)
+    for blob in blobs:
+        if blob is not None:
+            total += decode_hist(blob)
+    return total
+
+
+def quantile(latency_hist, q):
+    """Upper bound (ms) of the bucket holding the q-quantile, or None without data."""
+    n = latency_hist.sum()
+    if not n:
+        return None
+    index = int(np.searchsorted(np.cumsum(latency_hist), q * n))
+    return float(LATENCY_BOUNDS_MS[min(index, len(LATENCY_BOUNDS_MS) - 1)])
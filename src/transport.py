@@ -0,0 +1,85 @@
+"""
+Sentinel Stream - Kafka Transport
+Kafka / Redpanda backend for the producer and consumer (TRANSPORT=kafka).
+
+kafka-python is imported lazily, so the ZeroMQ demo runs without it. The
+producer and consumer loops accept an existing client, so an in-process
+fake with the same methods (send/flush/close, poll/commit/highwater/close)
+can stand in for a broker (tests/fakes.py).
+"""
+import time
+
+from src.config import (
+    TRANSACTIONS_TOPIC, WIRE_FORMAT, WIRE_DTYPE, get_kafka_config,
+    KAFKA_LINGER_MS, KAFKA_BATCH_BYTES, KAFKA_COMPRESSION, KAFKA_GROUP_ID, KAFKA_MAX_POLL_RECORDS
+)
+from src.wire import WIRE_FIELDS, encode_record_block, encode_json_value
+
+TRANSPORTS = ('zmq', 'kafka')
+
+
+def create_kafka_producer():
+    """KafkaProducer with the configured linger, batch size and compression."""
+    from kafka import KafkaProducer
+
+    return KafkaProducer(
+        **get_kafka_config(),
+        linger_ms=KAFKA_LINGER_MS,
+        batch_size=KAFKA_BATCH_BYTES,
+        compression_type=None if KAFKA_COMPRESSION == "none" else KAFKA_COMPRESSION
+    )
+
+
+def create_kafka_consumer(on_revoke=None):
+    """
+    KafkaConsumer subscribed to TRANSACTIONS_TOPIC with auto-commit off: the
+    caller commits once results are durable. on_revoke(partitions) runs
+    before partitions move to another group member, so it can flush and
+    commit what it already processed.
+    """
+    from kafka import KafkaConsumer, ConsumerRebalanceListener
+
+    class RevokeListener(ConsumerRebalanceListener):
+        def on_partitions_revoked(self, revoked):
+            if on_revoke is not None:
+                on_revoke(revoked)
+
+        def on_partitions_assigned(self, assigned):
+            print(f"📥 Assigned partitions: {sorted(tp.partition for tp in assigned)}")
+
+    consumer = KafkaConsumer(
+        **get_kafka_config(),
+        group_id=KAFKA_GROUP_ID,
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        max_poll_records=KAFKA_MAX_POLL_RECORDS
+    )
+    consumer.subscribe([TRANSACTIONS_TOPIC], listener=RevokeListener())
+    return consumer
+
+
+class KafkaSink:
+    """Producer side: publishes blocks of rows as Kafka records (batched by the client)."""
+
+    def __init__(self, producer, topic=TRANSACTIONS_TOPIC, wire_format=WIRE_FORMAT, dtype=WIRE_DTYPE):
+        self.producer = producer
+        self.topic = topic
+        self.wire_format = wire_format
+        self.dtype_size = 8 if dtype == "float64" else 4
+
+    def send_block(self, X, seq_start):
+        sent_ns = time.monotonic_ns()
+        if self.wire_format == "binary":
+            values = encode_record_block(X, seq_start, sent_ns, self.dtype_size)
+        else:
+            values = [
+                encode_json_value(dict(zip(WIRE_FIELDS, row)), seq_start + i, sent_ns)
+                for i, row in enumerate(X.tolist())
+            ]
+        send, topic = self.producer.send, self.topic
+        for value in values:
+            send(topic, value=value)
+
+    def close(self):
+        self.producer.flush()
+        self.producer.close()
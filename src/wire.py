@@ -0,0 +1,185 @@
+"""
+Sentinel Stream - Wire Format
+Encodes and decodes producer -> consumer messages.
+
+binary (default): ZeroMQ multipart [topic, header, payload]
+    header   20 bytes, little-endian: version (u8), dtype size (u8: 4 or 8),
+             n_features (u16), seq (i64), sent_ns (i64, time.monotonic_ns())
+    payload  N_FEATURES float32/float64 values in feature order
+             (time, V1-V28, amount)
+
+json (debug): one frame "<topic> <json>", readable with any ZeroMQ client.
+
+Kafka records carry the same bytes without the topic frame: the value is
+header + payload (binary) or the JSON object (json).
+"""
+import json
+import struct
+import numpy as np
+
+WIRE_VERSION = 1
+WIRE_FORMATS = ('binary', 'json')
+
+# Feature order of the binary payload, same as the model's Time, V1-V28, Amount
+WIRE_FIELDS = ['time'] + [f'V{i}' for i in range(1, 29)] + ['amount']
+N_FEATURES = len(WIRE_FIELDS)
+
+# JSON keys accepted besides WIRE_FIELDS (the model's TitleCase column names)
+JSON_ALIASES = {'time': 'Time', 'amount': 'Amount'}
+
+HEADER = struct.Struct('<BBHqq')
+HEADER_DTYPE = np.dtype([
+    ('version', 'u1'),
+    ('dtype', 'u1'),
+    ('n_features', '<u2'),
+    ('seq', '<i8'),
+    ('sent_ns', '<i8'),
+])
+PAYLOAD_DTYPES = {4: np.dtype('<f4'), 8: np.dtype('<f8')}
+
+
+def encode_binary_block(topic, X, seq_start, sent_ns, dtype_size=4):
+    """
+    Multipart frames for every row of a raw (N, N_FEATURES) matrix in
+    WIRE_FIELDS order. Headers and payloads are packed with NumPy in one
+    pass each, then sliced per message.
+    """
+    n = len(X)
+    headers = np.empty(n, dtype=HEADER_DTYPE)
+    headers['version'] = WIRE_VERSION
+    headers['dtype'] = dtype_size
+    headers['n_features'] = N_FEATURES
+    headers['seq'] = np.arange(seq_start, seq_start + n)
+    headers['sent_ns'] = sent_ns
+    header_bytes = headers.tobytes()
+    payload_bytes = np.ascontiguousarray(X, dtype=PAYLOAD_DTYPES[dtype_size]).tobytes()
+
+    topic = topic.encode()
+    h, p = HEADER.size, dtype_size * N_FEATURES
+    return [
+        [topic, header_bytes[i * h:(i + 1) * h], payload_bytes[i * p:(i + 1) * p]]
+        for i in range(n)
+    ]
+
+
+def encode_json(topic, tx, seq, sent_ns):
+    """Single text frame, the original debug-friendly format."""
+    return [topic.encode() + b" " + encode_json_value(tx, seq, sent_ns)]
+
+
+def encode_json_value(tx, seq, sent_ns):
+    return json.dumps(dict(tx, seq=seq, sent_ns=sent_ns)).encode()
+
+
+def record_dtype(dtype_size):
+    """Structured dtype of one binary Kafka record value: header fields + features."""
+    return np.dtype(HEADER_DTYPE.descr + [('features', PAYLOAD_DTYPES[dtype_size], (N_FEATURES,))])
+
+
+def encode_record_block(X, seq_start, sent_ns, dtype_size=4):
+    """Binary Kafka record values (header + payload) for every row of X, packed in one pass."""
+    n = len(X)
+    records = np.empty(n, dtype=record_dtype(dtype_size))
+    records['version'] = WIRE_VERSION
+    records['dtype'] = dtype_size
+    records['n_features'] = N_FEATURES
+    records['seq'] = np.arange(seq_start, seq_start + n)
+    records['sent_ns'] = sent_ns
+    records['features'] = X
+
+    data, width = records.tobytes(), records.itemsize
+    return [data[i * width:(i + 1) * width] for i in range(n)]
+
+
+def decode_records(values):
+    """
+    Decode a batch of Kafka record values, binary or JSON (see decode_batch).
+
+    Binary values of one dtype are joined and viewed as a structured array,
+    so the feature matrix is a strided view of the joined buffer.
+    """
+    return _decode_mixed(values, lambda value: not value.startswith(b'{'), _decode_record_values, _decode_json)
+
+
+def decode_batch(messages):
+    """
+    Decode a batch of received multipart messages (lists of frames).
+
+    Binary payloads are joined once and viewed with np.frombuffer as the
+    (N, N_FEATURES) matrix, no per-field parsing. JSON messages are parsed
+    as before. Messages without seq / sent_ns get -1.
+
+    Returns:
+        (seq, sent_ns, X): int64 arrays of length N and the raw feature
+        matrix in input order (float32 unless every payload is float64).
+    """
+    return _decode_mixed(
+        messages, lambda frames: len(frames) == 3, _decode_binary,
+        lambda text: _decode_json([frames[0].split(b" ", 1)[1] for frames in text])
+    )
+
+
+def _decode_mixed(messages, is_binary, decode_binary, decode_text):
+    binary = [i for i, message in enumerate(messages) if is_binary(message)]
+    if len(binary) == len(messages):
+        return decode_binary(messages)
+    if not binary:
+        return decode_text(messages)
+
+    # Mixed batch (a producer switched format): decode each group into its rows
+    text = [i for i, message in enumerate(messages) if not is_binary(message)]
+    seq = np.empty(len(messages), dtype=np.int64)
+    sent_ns = np.empty(len(messages), dtype=np.int64)
+    X = np.empty((len(messages), N_FEATURES), dtype=np.float32)
+    for rows, decode in ((binary, decode_binary), (text, decode_text)):
+        seq[rows], sent_ns[rows], X[rows] = decode([messages[i] for i in rows])
+    return seq, sent_ns, X
+
+
+def _decode_binary(messages):
+    if any(len(frames[1]) != HEADER.size for frames in messages):
+        raise ValueError(f"Truncated wire header (expected {HEADER.size} bytes)")
+    headers = np.frombuffer(b''.join(frames[1] for frames in messages), dtype=HEADER_DTYPE)
+    if (headers['version'] != WIRE_VERSION).any() or (headers['n_features'] != N_FEATURES).any():
+        raise ValueError(f"Unsupported wire header (expected version {WIRE_VERSION}, {N_FEATURES} features)")
+    if not np.isin(headers['dtype'], list(PAYLOAD_DTYPES)).all():
+        raise ValueError(f"Unsupported wire payload dtype size (expected one of {list(PAYLOAD_DTYPES)})")
+    # A short payload would otherwise shift every following row when the payloads are joined
+    lengths = np.fromiter((len(frames[2]) for frames in messages), dtype=np.int64, count=len(messages))
+    if (lengths != headers['dtype'].astype(np.int64) * N_FEATURES).any():
+        raise ValueError("Truncated wire payload")
+
+    sizes = np.unique(headers['dtype'])
+    if len(sizes) == 1 and int(sizes[0]) in PAYLOAD_DTYPES:
+        dtype = PAYLOAD_DTYPES[int(sizes[0])]
+        X = np.frombuffer(b''.join(frames[2] for frames in messages), dtype=dtype).reshape(-1, N_FEATURES)
+    else:
+        X = np.vstack([
+            np.frombuffer(frames[2], dtype=PAYLOAD_DTYPES[int(size)])
+            for frames, size in zip(messages, headers['dtype'])
+        ]).astype(np.float32)
+    return headers['seq'], headers['sent_ns'], X
+
+
+def _decode_record_values(values):
+    widths = {len(value) for value in values}
+    size = (widths.pop() - HEADER.size) // N_FEATURES if len(widths) == 1 else None
+    if size not in PAYLOAD_DTYPES:
+        # Mixed payload dtypes: split into header / payload frames
+        return _decode_binary([[None, value[:HEADER.size], value[HEADER.size:]] for value in values])
+
+    records = np.frombuffer(b''.join(values), dtype=record_dtype(size))
+    if (records['version'] != WIRE_VERSION).any() or (records['n_features'] != N_FEATURES).any():
+        raise ValueError(f"Unsupported wire header (expected version {WIRE_VERSION}, {N_FEATURES} features)")
+    return records['seq'], records['sent_ns'], records['features']
+
+
+def _decode_json(texts):
+    txs = [json.loads(text) for text in texts]
+    seq = np.fromiter((tx.get('seq', -1) for tx in txs), dtype=np.int64, count=len(txs))
+    sent_ns = np.fromiter((tx.get('sent_ns', -1) for tx in txs), dtype=np.int64, count=len(txs))
+    X = np.array([
+        [tx.get(field, tx.get(JSON_ALIASES.get(field), 0)) for field in WIRE_FIELDS]
+        for tx in txs
+    ], dtype=np.float32)
+    return seq, sent_ns, X
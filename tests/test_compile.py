@@ -0,0 +1,86 @@
+"""
+Compiled (native engine) models against the bundled sklearn/xgboost models.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from src.model.compile import compile_models, load_compiled, save_compiled, verify_compiled
+from src.model.predictor import MODELS_DIR, FraudPredictor, score_compiled
+
+TRANSACTIONS = [
+    {"time": 1000.0 * i, "amount": 10.0 * i, **{f"V{j}": np.sin(i * j) * 3 for j in range(1, 29)}}
+    for i in range(64)
+]
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return FraudPredictor(engine='sklearn')
+
+
+@pytest.fixture(scope="module")
+def compiled(reference):
+    return compile_models(reference.xgb_model, reference.iso_model, reference.scaler)
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    """A models/ directory with the bundled pickles at VERSION v2 and no compiled/ yet."""
+    for name in ('xgboost_model.pkl', 'isolation_forest.pkl', 'scaler.pkl'):
+        os.symlink(os.path.join(MODELS_DIR, name), tmp_path / name)
+    (tmp_path / 'VERSION').write_text('v2\n')
+    return tmp_path
+
+
+def test_compiled_trees_match_originals(reference, compiled):
+    # Wide spread with some NaNs reaches rare leaves and the default_left branches
+    X = np.random.default_rng(0).normal(0, 3, size=(5000, reference.scale_mean.shape[0]))
+    X[::97, 5] = np.nan
+    report = verify_compiled(compiled, reference.xgb_model, reference.iso_model, X)
+    assert report['fraud_mismatches'] == 0
+    assert report['anomaly_mismatches'] == 0
+
+
+def assert_same_predictions(native, reference):
+    for got, want in zip(native.predict_batch(TRANSACTIONS), reference.predict_batch(TRANSACTIONS)):
+        assert got['is_fraud'] == want['is_fraud']
+        assert got['is_anomaly'] == want['is_anomaly']
+        assert got['fraud_probability'] == pytest.approx(want['fraud_probability'], abs=1e-5)
+        assert got['anomaly_score'] == pytest.approx(want['anomaly_score'], abs=1e-5)
+
+
+def test_native_engine_matches_sklearn(reference):
+    assert_same_predictions(FraudPredictor(engine='native'), reference)
+
+
+def test_saved_artifact_memory_maps_to_the_same_scores(compiled, tmp_path):
+    save_compiled(compiled, tmp_path, model_version='v2')
+    loaded = load_compiled(tmp_path, mmap_mode='r')
+
+    assert isinstance(loaded.xgb.threshold, np.memmap)
+    assert isinstance(loaded.iso.value, np.memmap)
+    X = np.random.default_rng(1).normal(0, 3, size=(2000, len(compiled.scale_mean)))
+    for got, want in zip(score_compiled(loaded, X), score_compiled(compiled, X)):
+        assert np.array_equal(got, want)
+
+
+def test_native_engine_maps_artifact_of_current_version(compiled, models_dir):
+    save_compiled(compiled, models_dir / 'compiled', model_version='v2')
+    native = FraudPredictor(engine='native', models_dir=str(models_dir))
+
+    assert native.xgb_model is None
+    assert isinstance(native.compiled.xgb.value, np.memmap)
+
+
+@pytest.mark.parametrize("artifact_version", [None, 'v1'])
+def test_native_engine_falls_back_without_current_artifact(reference, compiled, models_dir, artifact_version):
+    # None: no compiled/ directory; 'v1': compiled from the pickles of an older VERSION
+    if artifact_version:
+        save_compiled(compiled, models_dir / 'compiled', model_version=artifact_version)
+    native = FraudPredictor(engine='native', models_dir=str(models_dir))
+
+    assert native.xgb_model is not None
+    assert not isinstance(native.compiled.xgb.value, np.memmap)
+    assert_same_predictions(native, reference)
@@ -0,0 +1,132 @@
+"""
+Loss accounting and credit flow control, fed sequence numbers directly.
+"""
+import socket
+import threading
+import time
+
+import pytest
+import zmq
+
+from src.consumer import SequenceTracker, StreamStats
+from src.flow import CreditSender, CreditWindow, window_hwm
+
+
+def rows(seqs):
+    # StreamStats only reads the seq (index 3) and queue_ms (index 4) of a scored row
+    return [(None, None, None, seq, None) for seq in seqs]
+
+
+def test_gaps_are_counted_once():
+    tracker = SequenceTracker()
+    assert tracker.update([10, 11, 14]) == 2  # joined at 10: 12 and 13 are lost
+    assert tracker.update([15, 18]) == 2
+    assert tracker.finish() == 0
+
+
+def test_reordering_within_window_is_not_a_loss():
+    tracker = SequenceTracker(reorder_window=4)
+    assert tracker.update([0, 2, 3]) == 0
+    assert tracker.update([1, 5, 4]) == 0
+    assert tracker.update([7, 6, 9]) == 0
+    assert tracker.finish() == 1  # 8 never came
+
+
+def test_arrival_beyond_window_was_already_counted():
+    tracker = SequenceTracker(reorder_window=2)
+    assert tracker.update([0, 1, 3, 4, 5, 6]) == 1  # 2 settled as lost once 5 arrived
+    assert tracker.update([2]) == 0  # late, not counted again or as a restart
+    assert tracker.finish() == 0
+
+
+def test_duplicates_are_not_arrivals_of_missing_numbers():
+    tracker = SequenceTracker(reorder_window=2)
+    assert tracker.update([0, 1, 1, 3]) == 0
+    assert tracker.update([3, 4, 4, 5]) == 1  # 2 is missing, however often 1, 3 and 4 arrive
+    assert tracker.finish() == 0
+
+
+def test_producer_restart_starts_counting_again():
+    tracker = SequenceTracker()
+    assert tracker.update(range(100)) == 0
+    assert tracker.update([0, 1, 2]) == 0  # sequence reset, not 97 losses
+    assert tracker.update([4]) == 1
+    assert tracker.finish() == 0
+
+
+def test_unstamped_messages_are_ignored():
+    tracker = SequenceTracker()
+    assert tracker.update([None, None]) == 0
+    assert tracker.finish() == 0
+    assert tracker.update([5, None, 7]) == 1
+
+
+class RecordedCredits:
+    def __init__(self):
+        self.acks = []
+        self.idles = 0
+
+    def ack(self, seq):
+        self.acks.append(seq)
+
+    def idle(self):
+        self.idles += 1
+
+
+def test_stats_ack_highest_seen_and_total_drops():
+    credits = RecordedCredits()
+    stats = StreamStats(reorder_window=0, credits=credits)
+    stats.record(3, rows([0, 1, 2]))
+    stats.record(2, rows([5, 6]))
+    stats.idle()
+    stats.summary()
+
+    assert credits.acks == [2, 6]
+    assert credits.idles == 1
+    assert (stats.received, stats.scored, stats.dropped) == (5, 5, 2)
+
+
+def test_window_hwm_holds_a_full_window():
+    assert window_hwm(1000, 5000) == 5000
+    assert window_hwm(10000, 5000) == 10000
+    assert window_hwm(0, 5000) == 0
+
+
+@pytest.fixture
+def credit_sockets():
+    with socket.socket() as probe:
+        probe.bind(("localhost", 0))
+        port = probe.getsockname()[1]
+    context = zmq.Context()
+    window = CreditWindow(context, 10, port=port)
+    sender = CreditSender(context, port=port)
+    yield window, sender
+    context.destroy(linger=0)
+
+
+def test_credit_window_blocks_until_acked(credit_sockets):
+    window, sender = credit_sockets
+    window.acquire(0, 10)  # a full window goes out without waiting
+    assert window.blocked_s == 0
+
+    threading.Timer(0.2, sender.ack, args=(4,)).start()
+    window.acquire(10, 5)
+    assert window.acked == 4
+    assert window.blocked_s >= 0.15
+
+
+def test_idle_consumer_releases_credits(credit_sockets):
+    window, sender = credit_sockets
+    window.acquire(0, 10)
+    sender.idle()
+    window.acquire(10, 10)  # everything sent so far counts as settled
+    assert window.acked == 9
+
+
+def test_acks_from_before_producer_restart_are_clamped(credit_sockets):
+    window, sender = credit_sockets
+    sender.ack(500)  # meant for the previous producer session
+    deadline = time.monotonic() + 5
+    while window.acked == -1 and time.monotonic() < deadline:
+        window.acquire(100, 1)
+    assert window.acked == 99  # never ahead of what this session has sent
@@ -0,0 +1,187 @@
+"""
+Inference API against the bundled models (models/), through TestClient.
+"""
+import asyncio
+import functools
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+
+import src.inference_api as api
+
+TRANSACTION = {"time": 40000.0, "amount": 123.45, **{f"V{i}": (-1) ** i * i / 7 for i in range(1, 29)}}
+
+
+def feature_matrix(n):
+    X = np.random.default_rng(0).normal(0, 2, size=(n, api.N_FEATURES))
+    X[:, 0] = np.arange(n) * 10.0  # Time
+    X[:, -1] = np.abs(X[:, -1]) * 100  # Amount >= 0
+    return X
+
+
+def arrow_body(X, max_chunksize=None):
+    table = pa.table({name: X[:, i] for i, name in enumerate(api.FEATURE_COLUMNS)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=max_chunksize)
+    return sink.getvalue().to_pybytes()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "MODEL_WATCH_INTERVAL", 0)
+    with TestClient(api.app) as client:
+        yield client
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("failures, ready", [(2, True), (3, False)])
+def test_warm_up_retries_then_fails_liveness(monkeypatch, failures, ready):
+    calls = 0
+    
+    def flaky_warmup(self, n_rows):
+        nonlocal calls
+        calls += 1
+        if calls <= failures:
+            raise RuntimeError("warm-up failed")
+    
+    monkeypatch.setattr(api, "MODEL_WATCH_INTERVAL", 0)
+    monkeypatch.setattr(api, "WARMUP_ATTEMPTS", 3)
+    monkeypatch.setattr(api, "WARMUP_RETRY_S", 0.01)
+    monkeypatch.setattr(api.FraudPredictor, "warmup", flaky_warmup)
+    with TestClient(api.app) as client:
+        wait_for(lambda: api.warmed_up or api.warmup_failed)
+        assert calls == 3
+        assert (client.get("/readyz").status_code == 200) is ready
+        assert (client.get("/livez").status_code == 200) is ready
+
+
+def test_microbatched_predict_matches_direct(monkeypatch):
+    monkeypatch.setattr(api, "MODEL_WATCH_INTERVAL", 0)
+    with TestClient(api.app) as client:
+        direct = client.post("/predict", json=TRANSACTION).json()
+    monkeypatch.setattr(api, "MICROBATCH_ENABLED", True)
+    with TestClient(api.app) as client:
+        batched = client.post("/predict", json=TRANSACTION).json()
+    
+    assert batched["fraud_probability"] == direct["fraud_probability"]
+    assert batched["anomaly_score"] == direct["anomaly_score"]
+
+
+def test_microbatches_use_every_worker(monkeypatch):
+    running, peak = 0, 0
+    lock = threading.Lock()
+    
+    class SlowPredictor:
+        def predict_batch(self, transactions):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.2)
+            with lock:
+                running -= 1
+            return [{"tx": tx} for tx in transactions]
+    
+    async def run():
+        monkeypatch.setattr(api, "predictor", SlowPredictor())
+        monkeypatch.setattr(api, "executor", api.InferenceExecutor(max_workers=2, max_queue=4))
+        batcher = api.MicroBatcher(max_wait_ms=1, max_batch_size=2, max_queue=16)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit({"n": n}) for n in range(4)))
+        finally:
+            await batcher.stop()
+            api.executor.shutdown()
+    
+    results = asyncio.run(run())
+    assert [result["tx"]["n"] for result, _ in results] == [0, 1, 2, 3]
+    assert peak == 2  # two batches of two scored at once
+
+
+def test_columnar_batch_matches_predict(client):
+    columns = list(TRANSACTION)
+    body = {"columns": columns, "rows": [[TRANSACTION[name] for name in columns]] * 3}
+    response = client.post("/batch_predict/columnar", json=body)
+    
+    assert response.status_code == 200
+    single = client.post("/predict", json=TRANSACTION).json()
+    assert response.json()["fraud_probability"] == [single["fraud_probability"]] * 3
+
+
+@pytest.mark.parametrize("body, detail", [
+    ({"columns": [["time"]], "rows": [[1.0]]}, "expected"),
+    ({"columns": ["time", "amount"], "rows": {"a": 1}}, "expected"),
+    ({"columns": ["time", "amount"], "rows": [[1, {"x": 1}]]}, "only numbers"),
+    ([[1.0] * 29 + [{"x": 1}]], "only numbers"),
+    ({"columns": ["time", "amount"], "rows": [[1, "x"]]}, "could not convert"),
+    ({"columns": ["time", "amount"], "rows": [[1, 2, 3]]}, "rows of 2 values"),
+    ("rows", "expected a list of rows"),
+])
+def test_columnar_batch_rejects_malformed_bodies(client, body, detail):
+    response = client.post("/batch_predict/columnar", json=body)
+    
+    assert response.status_code == 422
+    assert detail in response.json()["detail"]
+
+
+def test_arrow_scores_round_trip(client, monkeypatch):
+    monkeypatch.setattr(api, "SCORE_CHUNK_ROWS", 256)
+    X = feature_matrix(1000)
+    response = client.post(
+        "/score/arrow", content=arrow_body(X, max_chunksize=300),
+        headers={"Content-Type": api.ARROW_STREAM_TYPE}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["X-Model-Version"] == api.predictor.version
+    scores = pa.ipc.open_stream(response.content).read_all()
+    expected = api.predictor.score_matrix(X)
+    assert scores.num_rows == 1000
+    assert np.array_equal(scores["fraud_probability"].to_numpy(), expected["fraud_probability"].astype(np.float32))
+    assert np.array_equal(scores["is_anomaly"].to_numpy(), expected["is_anomaly"])
+
+
+def test_float32_scores_round_trip(client, monkeypatch):
+    monkeypatch.setattr(api, "SCORE_CHUNK_ROWS", 256)
+    X = feature_matrix(1000).astype("<f4")
+    response = client.post("/score/float32", content=X.tobytes())
+    
+    assert response.status_code == 200
+    pairs = np.frombuffer(response.content, dtype="<f4").reshape(-1, 2)
+    expected = api.predictor.score_matrix(X)
+    assert np.array_equal(pairs[:, 0], expected["fraud_probability"].astype(np.float32))
+    assert np.array_equal(pairs[:, 1], expected["anomaly_score"].astype(np.float32))
+
+
+def test_oversized_arrow_batch_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(api, "BodyPipe", functools.partial(api.BodyPipe, max_read=64 * 1024))
+    response = client.post(
+        "/score/arrow", content=arrow_body(feature_matrix(1000)),  # one ~240 KB record batch
+        headers={"Content-Type": api.ARROW_STREAM_TYPE}
+    )
+    
+    assert response.status_code == 413
+    assert "SCORE_MAX_BATCH_BYTES" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("endpoint, keep", [
+    ("/score/arrow", slice(None, -100)),  # ends inside the last record batch
+    ("/score/arrow", slice(None, 50)),  # ends inside the schema message
+    ("/score/float32", slice(None, -4)),  # last row one value short
+])
+def test_truncated_bulk_body_is_rejected(client, endpoint, keep):
+    X = feature_matrix(100)
+    body = arrow_body(X) if endpoint == "/score/arrow" else X.astype("<f4").tobytes()
+    response = client.post(endpoint, content=body[keep])
+    
+    assert response.status_code == 422
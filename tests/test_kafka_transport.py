@@ -0,0 +1,128 @@
+"""
+Kafka transport against the in-process broker: offsets must only be
+committed once the rows they cover are committed to SQLite.
+
+    python -m pytest tests
+"""
+import functools
+import os
+import signal
+import sqlite3
+
+import numpy as np
+import pytest
+
+import src.consumer as consumer
+from src.producer import generate_block
+from src.transport import KafkaSink
+
+from fakes import InProcessBroker, InProcessConsumer
+
+ROWS = 5000
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # DB_PATH is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(consumer, "start_metrics_server", lambda: None)
+    monkeypatch.setattr(consumer, "start_retention", lambda path: None)
+    consumer.init_db()
+    return tmp_path / consumer.DB_PATH
+
+
+@pytest.fixture(autouse=True)
+def stop_signals():
+    # The consume loops ignore SIGTERM/SIGINT while shutting down; give pytest its handlers back
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+@pytest.fixture
+def broker():
+    broker = InProcessBroker(partitions=3)
+    sink = KafkaSink(broker.producer())
+    sink.send_block(generate_block(ROWS, np.random.default_rng(0)), 0)
+    sink.close()
+    return broker
+
+
+def stored_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT count(*) FROM transactions").fetchone()[0]
+
+
+def test_commit_waits_for_flush(db, broker):
+    kafka = broker.consumer()
+    conn = consumer.connect_db()
+    buffer = consumer.WriteBuffer(conn, max_rows=10 * ROWS, max_interval_ms=60_000, on_flush=kafka.commit)
+    predictor = consumer.load_predictor()
+    
+    batches = kafka.poll(max_records=ROWS)
+    for records in batches.values():
+        buffer.extend(consumer.score_records(predictor, records, 0.0))
+    
+    assert sum(kafka.positions.values()) == ROWS
+    assert sum(broker.committed.values()) == 0  # buffered, not durable yet
+    
+    buffer.flush()
+    assert stored_rows(db) == ROWS
+    assert broker.committed == kafka.positions
+    conn.close()
+
+
+def test_consume_loop_commits_durable_offsets(db, broker, monkeypatch):
+    monkeypatch.setattr(consumer, "KAFKA_MAX_POLL_RECORDS", 700)
+    commits = []
+    
+    class CheckedConsumer(InProcessConsumer):
+        def poll(self, timeout_ms=0, max_records=500):
+            batches = super().poll(0, max_records)
+            if not batches and sum(self.positions.values()) == ROWS:
+                raise KeyboardInterrupt  # drained: stop like Ctrl+C
+            return batches
+        
+        def commit(self):
+            # Every committed offset must already be a row in SQLite
+            assert stored_rows(db) == sum(self.positions.values())
+            commits.append(dict(self.positions))
+            super().commit()
+    
+    consumer.kafka_consume_loop(CheckedConsumer(broker))
+    
+    assert stored_rows(db) == ROWS
+    assert commits
+    assert broker.committed == {tp: len(log) for tp, log in broker.logs.items()}
+
+
+def test_second_sigterm_does_not_interrupt_shutdown(db, broker, monkeypatch):
+    monkeypatch.setattr(consumer, "KAFKA_MAX_POLL_RECORDS", 700)
+    # Rows wait in the buffer until shutdown
+    monkeypatch.setattr(consumer, "WriteBuffer", functools.partial(consumer.WriteBuffer, max_rows=10 * ROWS))
+    signal.signal(signal.SIGTERM, consumer.handle_sigterm)
+    stopping = False
+    
+    class StoppedConsumer(InProcessConsumer):
+        def poll(self, timeout_ms=0, max_records=500):
+            nonlocal stopping
+            if sum(self.positions.values()):
+                # One batch is buffered but not flushed: the orchestrator stops the pod
+                stopping = True
+                os.kill(os.getpid(), signal.SIGTERM)
+            return super().poll(0, max_records)
+        
+        def commit(self):
+            if stopping:
+                os.kill(os.getpid(), signal.SIGTERM)  # ...and repeats itself during the final flush
+            super().commit()
+    
+    kafka = StoppedConsumer(broker)
+    try:
+        consumer.kafka_consume_loop(kafka)
+    except KeyboardInterrupt:
+        pytest.fail("second SIGTERM interrupted the final flush")
+    
+    assert stored_rows(db) == 700
+    assert broker.committed == kafka.positions
@@ -0,0 +1,21 @@
+"""
+FraudPredictor against the bundled models (models/).
+"""
+import numpy as np
+import pytest
+
+from src.model.predictor import FraudPredictor
+
+TRANSACTION = {"time": 40000.0, "amount": 123.45, **{f"V{i}": (-1) ** i * i / 7 for i in range(1, 29)}}
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    return FraudPredictor()
+
+
+def test_batch_and_single_paths_see_the_same_features(predictor):
+    single = predictor.preprocess(TRANSACTION).copy()
+    batched = (predictor.to_matrix([TRANSACTION]) - predictor.scale_mean) / predictor.scale_std
+    assert np.array_equal(single, batched)
+    assert predictor.predict_batch([TRANSACTION])[0] == predictor.predict(TRANSACTION)
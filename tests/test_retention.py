@@ -0,0 +1,93 @@
+"""
+Retention against a SQLite file: chunked expiry, and Parquet export of
+expired rows before they are deleted.
+"""
+import glob
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pyarrow.parquet as pq
+import pytest
+
+import src.consumer as consumer
+import src.retention as retention
+
+NOON = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = consumer.connect_db(str(tmp_path / "sentinel.db"))
+    consumer.create_schema(conn)
+    yield conn
+    conn.close()
+
+
+def insert(conn, start, n, step=timedelta(seconds=30)):
+    with conn:
+        conn.executemany(
+            "INSERT INTO transactions (timestamp, amount, fraud_prob, is_fraud) VALUES (?, 1.0, 0.1, 0)",
+            [((start + i * step).strftime('%Y-%m-%d %H:%M:%S'),) for i in range(n)]
+        )
+
+
+def rowids(conn):
+    return [rowid for (rowid,) in conn.execute("SELECT rowid FROM transactions ORDER BY rowid")]
+
+
+def test_expired_rows_are_deleted_in_chunks(conn, tmp_path):
+    insert(conn, NOON - timedelta(hours=2), 120)   # 10:00 - 10:59:30
+    insert(conn, NOON, 40)                         # 12:00 - 12:19:30
+    deletes = []
+    conn.set_trace_callback(lambda sql: deletes.append(sql) if sql.startswith("DELETE FROM transactions") else None)
+
+    worker = retention.RetentionWorker(str(tmp_path / "sentinel.db"), hours=1, chunk_rows=25, export="none")
+    assert worker.expire_transactions(conn, NOON - timedelta(minutes=30)) == 120
+
+    assert len(deletes) == 5  # 120 rows, 25 per transaction
+    assert rowids(conn) == list(range(121, 161))  # every recent row kept
+
+
+def test_rows_are_exported_before_they_are_deleted(conn, tmp_path, monkeypatch):
+    export_dir = tmp_path / "export"
+    monkeypatch.setattr(retention, "RETENTION_EXPORT_DIR", str(export_dir))
+    insert(conn, NOON - timedelta(hours=2), 120)   # hour 10: rowids 1-120
+    insert(conn, NOON - timedelta(hours=1), 60)    # hour 11, first half: 121-180
+    insert(conn, NOON + timedelta(minutes=30), 40) # recent: 181-220
+
+    def exported():
+        files = glob.glob(str(export_dir / "hour=*" / "transactions-*.parquet"))
+        return sorted(rowid for path in files for rowid in pq.read_table(path)["rowid"].to_pylist())
+
+    class CheckedWorker(retention.RetentionWorker):
+        def delete_through(self, conn, end, interruptible=True):
+            # Only rows already in a complete Parquet file may go
+            assert not end or exported()[-1] >= end
+            return super().delete_through(conn, end, interruptible)
+
+    worker = CheckedWorker(str(tmp_path / "sentinel.db"), hours=1, chunk_rows=50, export="parquet")
+
+    # Hour 11's file is still open at 11:30, so its rows stay in SQLite for now
+    assert worker.expire_transactions(conn, NOON - timedelta(minutes=30)) == 120
+    assert exported() == list(range(1, 121))
+    assert rowids(conn) == list(range(121, 221))
+
+    # Once hour 11 has fully expired its file completes and its rows go
+    assert worker.expire_transactions(conn, NOON + timedelta(minutes=15)) == 60
+    assert exported() == list(range(1, 181))
+    assert rowids(conn) == list(range(181, 221))
+    assert sorted(os.listdir(export_dir)) == ["hour=2026-01-01T10", "hour=2026-01-01T11"]
+
+
+def test_run_pass_expires_rollups(conn, tmp_path):
+    now = int(datetime.now(timezone.utc).timestamp())
+    with conn:
+        conn.executemany("INSERT INTO rollup_1s (bucket, count) VALUES (?, 1)", [(now - 7200,), (now,)])
+        conn.executemany("INSERT INTO rollup_1m (bucket, count) VALUES (?, 1)", [(now - 3 * 86400,), (now - 7200,)])
+
+    worker = retention.RetentionWorker(str(tmp_path / "sentinel.db"), hours=1, rollup_days=2, export="none")
+    worker.run_pass(conn)
+
+    assert [b for (b,) in conn.execute("SELECT bucket FROM rollup_1s")] == [now]
+    assert [b for (b,) in conn.execute("SELECT bucket FROM rollup_1m")] == [now - 7200]
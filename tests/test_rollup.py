@@ -0,0 +1,81 @@
+"""
+Rollups written by WriteBuffer.flush, on an in-memory SQLite database.
+"""
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+
+import src.consumer as consumer
+import src.rollup as rollup
+
+
+@pytest.fixture
+def conn():
+    conn = consumer.connect_db(":memory:")
+    consumer.create_schema(conn)
+    yield conn
+    conn.close()
+
+
+def scored_rows(n, seed):
+    # (amount, fraud_prob, is_fraud, seq, queue_ms, parse_ms, inference_ms, scored_ns)
+    rng = np.random.default_rng(seed)
+    prob = rng.random(n)
+    now_ns = time.monotonic_ns()
+    return [
+        (float(rng.random() * 500), float(p), bool(p > 0.9), i, float(rng.random() * 5), 0.1, 0.2, now_ns)
+        for i, p in enumerate(prob)
+    ]
+
+
+def totals(conn, table):
+    return conn.execute(f"SELECT sum(count), sum(fraud_count), sum(latency_sum_ms) FROM {table}").fetchone()
+
+
+def test_rollup_totals_match_raw_rows(conn):
+    buffer = consumer.WriteBuffer(conn, max_rows=10_000)
+    for seed, n in enumerate((250, 1, 999)):
+        buffer.extend(scored_rows(n, seed))
+        buffer.flush()
+
+    count, frauds, latency = conn.execute(
+        "SELECT count(*), sum(is_fraud), sum(latency_ms) FROM transactions"
+    ).fetchone()
+    assert count == 1250
+    for table in rollup.ROLLUP_TABLES:
+        rolled_count, rolled_frauds, rolled_latency = totals(conn, table)
+        assert (rolled_count, rolled_frauds) == (count, frauds)
+        assert rolled_latency == pytest.approx(latency)
+
+    latency_hist = rollup.merge_hists(
+        (blob for (blob,) in conn.execute("SELECT latency_hist FROM rollup_1m")), len(rollup.LATENCY_BOUNDS_MS) + 1
+    )
+    prob_hist = rollup.merge_hists(
+        (blob for (blob,) in conn.execute("SELECT prob_hist FROM rollup_1m")), len(rollup.PROB_BINS) - 1
+    )
+    assert latency_hist.sum() == prob_hist.sum() == count
+
+
+def test_rollup_update_shares_the_insert_transaction(conn, monkeypatch):
+    buffer = consumer.WriteBuffer(conn, max_rows=10_000)
+    buffer.extend(scored_rows(100, 0))
+    buffer.flush()
+
+    update_rollups = rollup.update_rollups
+
+    def update_then_fail(conn, rows, now=None):
+        update_rollups(conn, rows, now)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(consumer.rollup, "update_rollups", update_then_fail)
+    buffer.extend(scored_rows(50, 1))
+    with pytest.raises(sqlite3.OperationalError):
+        buffer.flush()
+
+    # Neither the rows nor their rollup update were committed; the rows wait for a retry
+    assert conn.execute("SELECT count(*) FROM transactions").fetchone()[0] == 100
+    for table in rollup.ROLLUP_TABLES:
+        assert totals(conn, table)[0] == 100
+    assert len(buffer.rows) == 50
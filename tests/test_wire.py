@@ -0,0 +1,102 @@
+"""
+Wire format: producer frames and Kafka record values decode back to the
+matrix that was sent, and malformed frames are rejected.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from src.wire import (
+    HEADER, N_FEATURES, WIRE_FIELDS, WIRE_VERSION,
+    decode_batch, decode_records, encode_binary_block, encode_json, encode_record_block
+)
+
+SENT_NS = 123_456_789
+
+
+def matrix(n=8):
+    X = np.random.default_rng(0).normal(size=(n, N_FEATURES))
+    X[1, 3] = np.nan
+    X[-1, -1] = np.nan
+    return X
+
+
+@pytest.mark.parametrize("dtype_size, dtype", [(4, np.float32), (8, np.float64)])
+def test_binary_block_round_trip(dtype_size, dtype):
+    X = matrix()
+    seq, sent_ns, decoded = decode_batch(encode_binary_block("tx", X, 100, SENT_NS, dtype_size))
+
+    assert seq.tolist() == list(range(100, 108))
+    assert (sent_ns == SENT_NS).all()
+    assert decoded.dtype == dtype
+    np.testing.assert_array_equal(decoded, X.astype(dtype))  # NaNs compare equal here
+
+
+def test_record_block_round_trip():
+    X = matrix()
+    seq, sent_ns, decoded = decode_records(encode_record_block(X, 0, SENT_NS))
+
+    assert seq.tolist() == list(range(8))
+    assert (sent_ns == SENT_NS).all()
+    np.testing.assert_array_equal(decoded, X.astype(np.float32))
+
+
+def test_mixed_batch_keeps_message_order():
+    X = matrix(3)
+    tx = dict(zip(WIRE_FIELDS, X[1].tolist()))
+    binary = encode_binary_block("tx", X, 0, SENT_NS)
+    messages = [binary[0], encode_json("tx", tx, 1, SENT_NS), binary[2]]
+
+    seq, _, decoded = decode_batch(messages)
+    assert seq.tolist() == [0, 1, 2]
+    np.testing.assert_array_equal(decoded, X.astype(np.float32))
+
+
+def test_json_round_trip_keeps_nan():
+    tx = {field: float(i) for i, field in enumerate(WIRE_FIELDS)}
+    tx['V2'] = float('nan')
+    seq, sent_ns, decoded = decode_batch([encode_json("tx", tx, 7, SENT_NS)])
+
+    assert (seq[0], sent_ns[0]) == (7, SENT_NS)
+    assert np.isnan(decoded[0, WIRE_FIELDS.index('V2')])
+    assert decoded[0, -1] == N_FEATURES - 1
+
+
+def test_truncated_header_is_rejected():
+    messages = encode_binary_block("tx", matrix(4), 0, SENT_NS)
+    messages[1][1] = messages[1][1][:-1]
+
+    with pytest.raises(ValueError, match="Truncated wire header"):
+        decode_batch(messages)
+
+
+def test_truncated_payload_is_rejected():
+    messages = encode_binary_block("tx", matrix(4), 0, SENT_NS)
+    # One value short here and one extra there: joined, the bytes still divide into rows
+    messages[1][2] = messages[1][2][:-4]
+    messages[2][2] = messages[2][2] + b'\0' * 4
+
+    with pytest.raises(ValueError, match="Truncated wire payload"):
+        decode_batch(messages)
+
+
+def test_truncated_record_value_is_rejected():
+    values = encode_record_block(matrix(4), 0, SENT_NS)
+    values[2] = values[2][:-4]
+
+    with pytest.raises(ValueError, match="Truncated"):
+        decode_records(values)
+
+
+@pytest.mark.parametrize("field, value", [("version", WIRE_VERSION + 1), ("n_features", N_FEATURES - 1)])
+def test_header_mismatch_is_rejected(field, value):
+    messages = encode_binary_block("tx", matrix(2), 0, SENT_NS)
+    version, dtype_size, n_features, seq, sent_ns = HEADER.unpack(messages[1][1])
+    header = {"version": version, "n_features": n_features, **{field: value}}
+    messages[1][1] = HEADER.pack(header["version"], dtype_size, header["n_features"], seq, sent_ns)
+
+    with pytest.raises(ValueError, match="Unsupported wire header"):
+        decode_batch(messages)
+    with pytest.raises(ValueError, match="Unsupported wire header"):
+        decode_records([messages[0][1] + messages[0][2], messages[1][1] + messages[1][2]])